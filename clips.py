@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+
+
+class Clip(object):
+    __slots__ = ('start', 'end', 'thumbnail')
+
+    def __init__(self, start: int, end: int = None, thumbnail: bytes = None):
+        self.start = start
+        self.end = end
+        self.thumbnail = thumbnail
+
+    def isComplete(self) -> bool:
+        return self.end is not None
+
+    def duration(self) -> int:
+        return self.end - self.start if self.end is not None else 0
+
+
+class ClipNode(object):
+    __slots__ = ('clip', 'key', 'priority', 'maxEnd', 'left', 'right')
+
+    def __init__(self, clip: Clip, serial: int):
+        self.clip = clip
+        self.key = (clip.start, serial)
+        self.priority = random.random()
+        self.maxEnd = clip.end
+        self.left = None
+        self.right = None
+
+    def update(self) -> 'ClipNode':
+        self.maxEnd = max(self.clip.end, self.left.maxEnd if self.left else self.clip.end,
+                          self.right.maxEnd if self.right else self.clip.end)
+        return self
+
+
+class ClipList(object):
+    def __init__(self):
+        self.clips = []
+        self.rows = {}
+        self.nodes = {}
+        self.root = None
+        self.serial = 0
+        self.runtime = 0
+
+    def __len__(self) -> int:
+        return len(self.clips)
+
+    def __iter__(self):
+        return iter(self.clips)
+
+    def __getitem__(self, index: int) -> Clip:
+        return self.clips[index]
+
+    def __contains__(self, clip: Clip) -> bool:
+        return clip in self.rows
+
+    def index(self, clip: Clip) -> int:
+        return self.rows[clip]
+
+    def last(self) -> Clip:
+        return self.clips[-1] if len(self.clips) else None
+
+    def append(self, clip: Clip) -> None:
+        self.rows[clip] = len(self.clips)
+        self.clips.append(clip)
+        self.indexClip(clip)
+
+    def remove(self, index: int) -> Clip:
+        clip = self.clips.pop(index)
+        del self.rows[clip]
+        self.unindexClip(clip)
+        self.renumber(index, len(self.clips))
+        return clip
+
+    def move(self, source: int, destination: int) -> None:
+        self.clips.insert(destination, self.clips.pop(source))
+        self.renumber(min(source, destination), max(source, destination) + 1)
+
+    def renumber(self, first: int, last: int) -> None:
+        for row in range(first, min(last, len(self.clips))):
+            self.rows[self.clips[row]] = row
+
+    def clear(self) -> None:
+        self.clips = []
+        self.rows.clear()
+        self.nodes.clear()
+        self.root = None
+        self.runtime = 0
+
+    def setEnd(self, clip: Clip, end: int) -> None:
+        self.unindexClip(clip)
+        clip.end = end
+        self.indexClip(clip)
+
+    def indexClip(self, clip: Clip) -> None:
+        if not clip.isComplete():
+            return
+        self.serial += 1
+        node = ClipNode(clip, self.serial)
+        self.nodes[clip] = node
+        left, right = self.split(self.root, node.key)
+        self.root = self.merge(self.merge(left, node), right)
+        self.runtime += clip.duration()
+
+    def unindexClip(self, clip: Clip) -> None:
+        node = self.nodes.pop(clip, None)
+        if node is None:
+            return
+        left, right = self.split(self.root, node.key)
+        middle, right = self.split(right, (node.key[0], node.key[1] + 1))
+        self.root = self.merge(left, right)
+        self.runtime -= clip.duration()
+
+    def split(self, node: ClipNode, key: tuple) -> tuple:
+        if node is None:
+            return None, None
+        if node.key < key:
+            node.right, right = self.split(node.right, key)
+            return node.update(), right
+        left, node.left = self.split(node.left, key)
+        return left, node.update()
+
+    def merge(self, left: ClipNode, right: ClipNode) -> ClipNode:
+        if left is None or right is None:
+            return left or right
+        if left.priority > right.priority:
+            left.right = self.merge(left.right, right)
+            return left.update()
+        right.left = self.merge(left, right.left)
+        return right.update()
+
+    def collect(self, node: ClipNode, start: int, end: int, found: list, limit: int) -> None:
+        if node is None or node.maxEnd <= start or len(found) >= limit:
+            return
+        self.collect(node.left, start, end, found, limit)
+        if node.clip.start < end and len(found) < limit:
+            if node.clip.end > start:
+                found.append(node.clip)
+            self.collect(node.right, start, end, found, limit)
+
+    def overlapping(self, start: int, end: int) -> list:
+        found = []
+        self.collect(self.root, start, end, found, len(self.nodes))
+        return found
+
+    def covering(self, position: int) -> list:
+        return self.overlapping(position, position + 1)
+
+    def hasOverlap(self, clip: Clip) -> bool:
+        if not clip.isComplete():
+            return False
+        found = []
+        self.collect(self.root, clip.start, clip.end, found, 2)
+        return any(other is not clip for other in found)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import mmap
+import os
+import struct
+
+try:
+    from vidcutter.packetindex import PacketIndex
+except ImportError:
+    from packetindex import PacketIndex
+
+
+class ContainerIndex(object):
+    mp4Containers = (b'moov', b'trak', b'mdia', b'minf', b'stbl', b'edts')
+    mp4Extensions = ('.mp4', '.m4v', '.mov', '.3gp', '.3g2')
+    mkvExtensions = ('.mkv', '.webm', '.mka')
+
+    MKV_SEGMENT = 0x18538067
+    MKV_INFO = 0x1549A966
+    MKV_TIMECODESCALE = 0x2AD7B1
+    MKV_TRACKS = 0x1654AE6B
+    MKV_TRACKENTRY = 0xAE
+    MKV_TRACKNUMBER = 0xD7
+    MKV_TRACKTYPE = 0x83
+    MKV_CUES = 0x1C53BB6B
+    MKV_CUEPOINT = 0xBB
+    MKV_CUETIME = 0xB3
+    MKV_CUETRACKPOSITIONS = 0xB7
+    MKV_CUETRACK = 0xF7
+    MKV_CUECLUSTERPOSITION = 0xF1
+
+    @classmethod
+    def read(cls, path: str) -> list:
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in cls.mp4Extensions + cls.mkvExtensions:
+            return None
+        try:
+            with open(path, 'rb') as mediafile:
+                data = mmap.mmap(mediafile.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    if ext in cls.mp4Extensions:
+                        return cls.readMP4(data)
+                    return cls.readMatroska(data)
+                finally:
+                    data.close()
+        except (OSError, ValueError, IndexError, KeyError, struct.error):
+            return None
+
+    @classmethod
+    def mp4Boxes(cls, data: mmap.mmap, start: int, end: int):
+        pos = start
+        while pos + 8 <= end:
+            size, boxtype = struct.unpack_from('>I4s', data, pos)
+            header = 8
+            if size == 1:
+                size, header = struct.unpack_from('>Q', data, pos + 8)[0], 16
+            elif size == 0:
+                size = end - pos
+            if size < header or pos + size > end:
+                raise ValueError('Truncated MP4 box')
+            yield boxtype, pos + header, pos + size
+            pos += size
+
+    @classmethod
+    def mp4Tree(cls, data: mmap.mmap, start: int, end: int, tree: dict) -> dict:
+        for boxtype, body, boxend in cls.mp4Boxes(data, start, end):
+            if boxtype in cls.mp4Containers:
+                tree.setdefault(boxtype, []).append(cls.mp4Tree(data, body, boxend, {}))
+            else:
+                tree.setdefault(boxtype, []).append((body, boxend))
+        return tree
+
+    @staticmethod
+    def mp4Table(data: mmap.mmap, box: tuple, fmt: str, skip: int = 0) -> list:
+        body, end = box
+        count = struct.unpack_from('>I', data, body + 4 + skip)[0]
+        start = body + 8 + skip
+        size = struct.calcsize('>' + fmt)
+        if start + count * size > end:
+            raise ValueError('Truncated MP4 table')
+        return list(struct.iter_unpack('>' + fmt, data[start:start + count * size]))
+
+    @classmethod
+    def readMP4(cls, data: mmap.mmap) -> list:
+        tree = cls.mp4Tree(data, 0, len(data), {})
+        if b'moof' in tree or b'moov' not in tree:
+            return None
+        for trak in tree[b'moov'][0].get(b'trak', []):
+            mdia = trak.get(b'mdia', [{}])[0]
+            hdlr = mdia.get(b'hdlr')
+            if hdlr is None or data[hdlr[0][0] + 8:hdlr[0][0] + 12] != b'vide':
+                continue
+            body = mdia[b'mdhd'][0][0]
+            timescale = struct.unpack_from('>I', data, body + (20 if data[body] == 1 else 12))[0]
+            stbl = mdia[b'minf'][0][b'stbl'][0]
+            return cls.mp4Samples(data, stbl, timescale, cls.mp4EditOffset(data, trak))
+        return None
+
+    @classmethod
+    def mp4EditOffset(cls, data: mmap.mmap, trak: dict) -> int:
+        for edts in trak.get(b'edts', []):
+            for elst in edts.get(b'elst', []):
+                version = data[elst[0]]
+                for entry in cls.mp4Table(data, elst, 'QqI' if version == 1 else 'IiI'):
+                    if entry[1] >= 0:
+                        return entry[1]
+        return 0
+
+    @classmethod
+    def mp4Samples(cls, data: mmap.mmap, stbl: dict, timescale: int, offset: int) -> list:
+        if b'stsz' not in stbl or not timescale:
+            return None
+        body = stbl[b'stsz'][0][0]
+        constant, count = struct.unpack_from('>II', data, body + 4)
+        sizes = [constant] * count if constant else [entry[0] for entry in cls.mp4Table(data, stbl[b'stsz'][0],
+                                                                                          'I', 4)]
+        if b'stco' in stbl:
+            chunks = [entry[0] for entry in cls.mp4Table(data, stbl[b'stco'][0], 'I')]
+        else:
+            chunks = [entry[0] for entry in cls.mp4Table(data, stbl[b'co64'][0], 'Q')]
+        positions = []
+        runs = cls.mp4Table(data, stbl[b'stsc'][0], 'III')
+        for run, (firstChunk, perChunk, _) in enumerate(runs):
+            lastChunk = runs[run + 1][0] - 1 if run + 1 < len(runs) else len(chunks)
+            for chunk in range(firstChunk - 1, lastChunk):
+                pos = chunks[chunk]
+                for _ in range(perChunk):
+                    if len(positions) == count:
+                        break
+                    positions.append(pos)
+                    pos += sizes[len(positions) - 1]
+        decodeTimes, dts = [], 0
+        for samples, delta in cls.mp4Table(data, stbl[b'stts'][0], 'II'):
+            for _ in range(samples):
+                decodeTimes.append(dts)
+                dts += delta
+        offsets = [0] * count
+        if b'ctts' in stbl:
+            sample = 0
+            for samples, shift in cls.mp4Table(data, stbl[b'ctts'][0], 'Ii'):
+                offsets[sample:sample + samples] = [shift] * samples
+                sample += samples
+        if b'stss' in stbl:
+            sync = set(entry[0] - 1 for entry in cls.mp4Table(data, stbl[b'stss'][0], 'I'))
+        else:
+            sync = set(range(count))
+        if not len(positions) == len(decodeTimes) == count:
+            raise ValueError('Inconsistent MP4 sample tables')
+        return [((decodeTimes[sample] + offsets[sample] - offset) / timescale, positions[sample], sizes[sample],
+                 PacketIndex.KEYFRAME if sample in sync else 0) for sample in range(count)]
+
+    @staticmethod
+    def ebmlVint(data: mmap.mmap, pos: int, keepMarker: bool) -> tuple:
+        first = data[pos]
+        length = 1
+        while length <= 8 and not first & (0x80 >> (length - 1)):
+            length += 1
+        if length > 8:
+            raise ValueError('Invalid EBML variable-length integer')
+        value = first if keepMarker else first & (0xFF >> length)
+        for byte in data[pos + 1:pos + length]:
+            value = (value << 8) | byte
+        if not keepMarker and value == (1 << (7 * length)) - 1:
+            value = -1
+        return value, pos + length
+
+    @classmethod
+    def ebmlElements(cls, data: mmap.mmap, start: int, end: int):
+        pos = start
+        while pos < end:
+            elementId, pos = cls.ebmlVint(data, pos, True)
+            size, pos = cls.ebmlVint(data, pos, False)
+            if size < 0:
+                raise ValueError('Unknown-size EBML element')
+            yield elementId, pos, pos + size
+            pos += size
+
+    @staticmethod
+    def ebmlUint(data: mmap.mmap, start: int, end: int) -> int:
+        return int.from_bytes(data[start:end], 'big')
+
+    @classmethod
+    def readMatroska(cls, data: mmap.mmap) -> list:
+        segment = None
+        for elementId, start, end in cls.ebmlElements(data, 0, len(data)):
+            if elementId == cls.MKV_SEGMENT:
+                segment = (start, end)
+                break
+        if segment is None:
+            return None
+        timescale, videoTrack, cues = 1000000, None, None
+        for elementId, start, end in cls.ebmlElements(data, segment[0], segment[1]):
+            if elementId == cls.MKV_INFO:
+                for childId, childStart, childEnd in cls.ebmlElements(data, start, end):
+                    if childId == cls.MKV_TIMECODESCALE:
+                        timescale = cls.ebmlUint(data, childStart, childEnd)
+            elif elementId == cls.MKV_TRACKS:
+                videoTrack = cls.mkvVideoTrack(data, start, end)
+            elif elementId == cls.MKV_CUES:
+                cues = (start, end)
+        if videoTrack is None or cues is None:
+            return None
+        points = []
+        for elementId, start, end in cls.ebmlElements(data, cues[0], cues[1]):
+            if elementId != cls.MKV_CUEPOINT:
+                continue
+            time, position = None, None
+            for childId, childStart, childEnd in cls.ebmlElements(data, start, end):
+                if childId == cls.MKV_CUETIME:
+                    time = cls.ebmlUint(data, childStart, childEnd)
+                elif childId == cls.MKV_CUETRACKPOSITIONS and position is None:
+                    track, cluster = None, None
+                    for fieldId, fieldStart, fieldEnd in cls.ebmlElements(data, childStart, childEnd):
+                        if fieldId == cls.MKV_CUETRACK:
+                            track = cls.ebmlUint(data, fieldStart, fieldEnd)
+                        elif fieldId == cls.MKV_CUECLUSTERPOSITION:
+                            cluster = cls.ebmlUint(data, fieldStart, fieldEnd)
+                    if track == videoTrack:
+                        position = cluster
+            if time is not None and position is not None:
+                points.append((time * timescale / 1000000000, segment[0] + position))
+        if not len(points):
+            return None
+        points.sort()
+        ends = [pos for _, pos in points[1:]] + [segment[1]]
+        return [(time, pos, max(0, end - pos), PacketIndex.KEYFRAME) for (time, pos), end in zip(points, ends)]
+
+    @classmethod
+    def mkvVideoTrack(cls, data: mmap.mmap, start: int, end: int) -> int:
+        for elementId, entryStart, entryEnd in cls.ebmlElements(data, start, end):
+            if elementId != cls.MKV_TRACKENTRY:
+                continue
+            number, tracktype = None, None
+            for childId, childStart, childEnd in cls.ebmlElements(data, entryStart, entryEnd):
+                if childId == cls.MKV_TRACKNUMBER:
+                    number = cls.ebmlUint(data, childStart, childEnd)
+                elif childId == cls.MKV_TRACKTYPE:
+                    tracktype = cls.ebmlUint(data, childStart, childEnd)
+            if tracktype == 1:
+                return number
+        return None
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from PyQt5.QtCore import QObject, QSize, QThread, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QImage
+
+try:
+    import av
+except ImportError:
+    av = None
+
+
+class DecoderSession(object):
+    def __init__(self, source: str):
+        self.source = source
+        self.container = av.open(source)
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = 'AUTO'
+        self.startTime = self.stream.start_time or 0
+        self.forwardWindow = int(2 / self.stream.time_base)
+        self.lastPts = None
+
+    @staticmethod
+    def available() -> bool:
+        return av is not None
+
+    def pts(self, position: int) -> int:
+        return self.startTime + int(position / 1000 / self.stream.time_base)
+
+    def fitted(self, size: QSize) -> QSize:
+        width, height = self.stream.codec_context.width, self.stream.codec_context.height
+        if not width or not height:
+            return size
+        scale = min(size.width() / width, size.height() / height)
+        return QSize(max(1, int(width * scale)), max(1, int(height * scale)))
+
+    def frame(self, position: int, size: QSize, accurate: bool = True) -> QImage:
+        target = self.pts(position)
+        try:
+            if not accurate or self.lastPts is None or not self.lastPts < target <= self.lastPts + self.forwardWindow:
+                self.container.seek(target, stream=self.stream, backward=True, any_frame=False)
+            for frame in self.container.decode(self.stream):
+                if accurate and (frame.pts is None or frame.pts < target):
+                    continue
+                self.lastPts = frame.pts if accurate else None
+                scaled = self.fitted(size)
+                plane = frame.reformat(scaled.width(), scaled.height(), 'rgb24').planes[0]
+                return QImage(bytes(plane), scaled.width(), scaled.height(), plane.line_size,
+                              QImage.Format_RGB888).copy()
+        except av.error.FFmpegError:
+            pass
+        self.lastPts = None
+        return None
+
+    def close(self) -> None:
+        self.container.close()
+
+
+class DecoderWorker(QObject):
+    frameDecoded = pyqtSignal(object, QImage)
+
+    def __init__(self, session: DecoderSession):
+        super(DecoderWorker, self).__init__()
+        self.session = session
+        self.stopping = False
+
+    @pyqtSlot(object, int, QSize, bool)
+    def decode(self, token: object, position: int, size: QSize, accurate: bool) -> None:
+        image = None
+        if not self.stopping:
+            image = self.session.frame(position, size, accurate)
+        self.frameDecoded.emit(token, image if image is not None else QImage())
+
+    @pyqtSlot()
+    def close(self) -> None:
+        self.session.close()
+        QThread.currentThread().quit()
+
+
+class DecoderThread(QObject):
+    requested = pyqtSignal(object, int, QSize, bool)
+    closing = pyqtSignal()
+
+    def __init__(self, session: DecoderSession, parent=None):
+        super(DecoderThread, self).__init__(parent)
+        self.source = session.source
+        self.thread = QThread(self)
+        self.worker = DecoderWorker(session)
+        self.worker.moveToThread(self.thread)
+        self.frameDecoded = self.worker.frameDecoded
+        self.requested.connect(self.worker.decode)
+        self.closing.connect(self.worker.close)
+        self.thread.finished.connect(self.worker.deleteLater)
+        self.thread.start()
+
+    def request(self, token: object, position: int, size: QSize, accurate: bool = True) -> None:
+        self.requested.emit(token, position, size, accurate)
+
+    def close(self) -> None:
+        self.worker.stopping = True
+        self.closing.emit()
+        self.thread.wait()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+ClipPlan = namedtuple('ClipPlan', ['start', 'end', 'strategy', 'error', 'seconds', 'bytes'])
+
+
+class ExportPlanner(object):
+    COPY, SMARTCUT, REENCODE = 'copy', 'smartcut', 'reencode'
+
+    processOverhead = 0.3
+    diskRate = 100 * 1024 * 1024
+    encodeRate = 1920 * 1080 * 30 * 1.5
+    defaultBitrate = 8 * 1000 * 1000
+
+    def __init__(self, videoService, tolerance: float = -1.0):
+        self.videoService = videoService
+        self.tolerance = tolerance
+
+    def frameDuration(self, source: str) -> float:
+        stream = self.videoService.videoStream(source)
+        return float(1 / stream.frameRate) if stream is not None and stream.frameRate else 0.04
+
+    def bitrate(self, source: str) -> float:
+        info = self.videoService.mediaInfo(source)
+        stream = self.videoService.videoStream(source)
+        for value in (info.format.bitRate, stream.bitRate if stream is not None else 0):
+            if value > 0:
+                return float(value)
+        return self.defaultBitrate
+
+    def encodeSpeed(self, source: str) -> float:
+        stream = self.videoService.videoStream(source)
+        width, height = (stream.width, stream.height) if stream is not None else (0, 0)
+        pixels = max(1, (width or 1920) * (height or 1080))
+        return self.encodeRate / (pixels / self.frameDuration(source))
+
+    def audioByterate(self, source: str) -> float:
+        return sum(stream.bitRate for stream in self.videoService.mediaInfo(source).streams
+                   if stream.codecType == 'audio') / 8
+
+    def copyBytes(self, source: str, start: float, end: float, byterate: float) -> float:
+        index = self.videoService.packetIndex(source)
+        if index is None or not index.packetCount:
+            return (end - start) * byterate
+        return index.bytesBetween(start, end) + (end - start) * self.audioByterate(source)
+
+    def canEncode(self, source: str) -> bool:
+        stream = self.videoService.videoStream(source)
+        return stream is not None and stream.codecName in self.videoService.encoders
+
+    def plan(self, source: str, clips: list) -> list:
+        keyframes = self.videoService.keyframes(source)
+        byterate = self.bitrate(source) / 8
+        speed = self.encodeSpeed(source)
+        tolerance = self.tolerance
+        if tolerance == 0:
+            tolerance = self.frameDuration(source) / 2
+        plans = []
+        for start, end in clips:
+            duration = end - start
+            snapped = self.videoService.snapToKeyframe(source, start)
+            error = start - snapped
+            copyBytes = self.copyBytes(source, snapped, end, byterate)
+            copy = ClipPlan(snapped, end, self.COPY, error, self.processOverhead + copyBytes / self.diskRate, copyBytes)
+            if tolerance < 0 or error <= tolerance or not self.canEncode(source):
+                plans.append(copy)
+                continue
+            reencode = ClipPlan(start, end, self.REENCODE, 0.0, self.processOverhead + duration / speed,
+                                duration * byterate)
+            inner = keyframes[bisect_left(keyframes, start):bisect_right(keyframes, end)]
+            if len(inner) >= 2:
+                edges = (inner[0] - start) + (end - inner[-1])
+                smartcut = ClipPlan(start, end, self.SMARTCUT, 0.0,
+                                    self.processOverhead * 4 + edges / speed + 2 * duration * byterate / self.diskRate,
+                                    2 * duration * byterate)
+                plans.append(min(smartcut, reencode, key=lambda item: item.seconds))
+            else:
+                plans.append(reencode)
+        return plans
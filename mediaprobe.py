@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+from fractions import Fraction
+from typing import NamedTuple
+
+try:
+    from vidcutter.mediasource import MediaSource
+except ImportError:
+    from mediasource import MediaSource
+
+StreamInfo = NamedTuple('StreamInfo', [('index', int), ('codecType', str), ('codecName', str), ('profile', str),
+                                       ('width', int), ('height', int), ('pixelFormat', str), ('frameRate', Fraction),
+                                       ('timeBase', Fraction), ('bitRate', int), ('duration', float),
+                                       ('startTime', float), ('hasBFrames', int), ('sampleRate', int),
+                                       ('channels', int), ('channelLayout', str), ('tags', dict)])
+
+FormatInfo = NamedTuple('FormatInfo', [('formatName', str), ('formatLongName', str), ('duration', float),
+                                       ('startTime', float), ('size', int), ('bitRate', int), ('tags', dict)])
+
+MediaInfo = NamedTuple('MediaInfo', [('source', str), ('format', FormatInfo), ('streams', list)])
+
+
+class MediaProbe(object):
+    version = 1
+
+    def __init__(self, path: str):
+        self.path = path
+        self.memory = {}
+        os.makedirs(self.path, exist_ok=True)
+
+    @staticmethod
+    def toInt(value, default: int = 0) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
+    @staticmethod
+    def toFloat(value, default: float = 0.0) -> float:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return default
+
+    @staticmethod
+    def toFraction(value) -> Fraction:
+        try:
+            num, den = (int(part) for part in str(value).split('/'))
+            return Fraction(num, den) if num > 0 and den > 0 else Fraction(0)
+        except ValueError:
+            return Fraction(0)
+
+    @classmethod
+    def parseStream(cls, data: dict) -> StreamInfo:
+        frameRate = cls.toFraction(data.get('avg_frame_rate'))
+        if not frameRate:
+            frameRate = cls.toFraction(data.get('r_frame_rate'))
+        return StreamInfo(cls.toInt(data.get('index')), data.get('codec_type', ''), data.get('codec_name', ''),
+                          data.get('profile', ''), cls.toInt(data.get('width')), cls.toInt(data.get('height')),
+                          data.get('pix_fmt', ''), frameRate, cls.toFraction(data.get('time_base')),
+                          cls.toInt(data.get('bit_rate')), cls.toFloat(data.get('duration')),
+                          cls.toFloat(data.get('start_time')), cls.toInt(data.get('has_b_frames')),
+                          cls.toInt(data.get('sample_rate')), cls.toInt(data.get('channels')),
+                          data.get('channel_layout', ''), data.get('tags', {}))
+
+    @classmethod
+    def parseFormat(cls, data: dict) -> FormatInfo:
+        return FormatInfo(data.get('format_name', ''), data.get('format_long_name', ''),
+                          cls.toFloat(data.get('duration')), cls.toFloat(data.get('start_time')),
+                          cls.toInt(data.get('size')), cls.toInt(data.get('bit_rate')), data.get('tags', {}))
+
+    @classmethod
+    def parse(cls, source: str, data: dict) -> MediaInfo:
+        return MediaInfo(source, cls.parseFormat(data.get('format', {})),
+                         [cls.parseStream(stream) for stream in data.get('streams', [])])
+
+    @classmethod
+    def empty(cls, source: str) -> MediaInfo:
+        return cls.parse(source, {})
+
+    def key(self, source: str) -> str:
+        ident = '%s|%i' % (MediaSource.identity(source), self.version)
+        return hashlib.sha1(ident.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def args(source: str) -> str:
+        return '-v quiet -show_streams -show_format -of json "%s"' % source
+
+    def cached(self, source: str) -> MediaInfo:
+        try:
+            key = self.key(source)
+        except OSError:
+            return self.empty(source)
+        if key not in self.memory:
+            data = self.load(key)
+            if data is None:
+                return None
+            self.memory[key] = self.parse(source, data)
+        return self.memory[key]
+
+    def ingest(self, source: str, output: str) -> MediaInfo:
+        try:
+            key = self.key(source)
+        except OSError:
+            return self.empty(source)
+        try:
+            data = json.loads(output)
+        except ValueError:
+            self.memory[key] = self.empty(source)
+            return self.memory[key]
+        self.store(key, data)
+        self.memory[key] = self.parse(source, data)
+        return self.memory[key]
+
+    def load(self, key: str) -> dict:
+        try:
+            with open(os.path.join(self.path, '%s.json' % key), encoding='utf-8') as cachefile:
+                return json.load(cachefile)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key: str, data: dict) -> None:
+        try:
+            with open(os.path.join(self.path, '%s.json' % key), 'w', encoding='utf-8') as cachefile:
+                json.dump(data, cachefile)
+        except OSError:
+            pass
+
+    @staticmethod
+    def firstStream(info: MediaInfo, codecType: str) -> StreamInfo:
+        for stream in info.streams:
+            if stream.codecType == codecType:
+                return stream
+        return None
+
+    @classmethod
+    def incompatibilities(cls, first: MediaInfo, other: MediaInfo) -> list:
+        problems = []
+        checks = (('video', ('codecName', 'width', 'height', 'pixelFormat', 'timeBase')),
+                  ('audio', ('codecName', 'sampleRate', 'channels')))
+        for codecType, fields in checks:
+            expected, actual = cls.firstStream(first, codecType), cls.firstStream(other, codecType)
+            if (expected is None) != (actual is None):
+                problems.append('%s stream %s' % (codecType, 'missing' if actual is None else 'unexpected'))
+            elif expected is not None:
+                problems += ['%s %s %s != %s' % (codecType, field, getattr(actual, field), getattr(expected, field))
+                             for field in fields if getattr(actual, field) != getattr(expected, field)]
+        return problems
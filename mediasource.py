@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+
+
+class MediaSource(object):
+    @staticmethod
+    def identity(source: str) -> str:
+        info = os.stat(source)
+        return '%s|%i|%i' % (os.path.abspath(source), info.st_size, info.st_mtime_ns)
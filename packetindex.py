@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import mmap
+import os
+import struct
+from bisect import bisect_left, bisect_right
+
+
+class PacketColumn(object):
+    def __init__(self, index, offset: int, count: int, field: int):
+        self.index = index
+        self.offset = offset
+        self.count = count
+        self.field = field
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[position] for position in range(*item.indices(self.count))]
+        if item < 0:
+            item += self.count
+        if not 0 <= item < self.count:
+            raise IndexError('packet index out of range')
+        return self.index.record(self.offset + item)[self.field]
+
+
+class PacketIndex(object):
+    headerStruct = struct.Struct('<4sHHII')
+    recordStruct = struct.Struct('<dqIB3xQ')
+    magic = b'VCPI'
+    version = 2
+    PTS, POS, SIZE, FLAGS, CUMULATIVE = range(5)
+    KEYFRAME = 1
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, recordSize, self.keyCount, self.packetCount = self.headerStruct.unpack_from(self.data)
+            if (magic, version, recordSize) != (self.magic, self.version, self.recordStruct.size) \
+                    or len(self.data) != self.headerStruct.size + (self.keyCount + self.packetCount) * recordSize:
+                raise ValueError('Invalid packet index: %s' % path)
+        except (OSError, ValueError, struct.error):
+            self.file.close()
+            raise
+        self.keyframes = PacketColumn(self, 0, self.keyCount, self.PTS)
+        self.packets = PacketColumn(self, self.keyCount, self.packetCount, self.PTS)
+        self.cumulative = PacketColumn(self, self.keyCount, self.packetCount, self.CUMULATIVE)
+
+    def record(self, position: int) -> tuple:
+        return self.recordStruct.unpack_from(self.data, self.headerStruct.size + position * self.recordStruct.size)
+
+    @classmethod
+    def write(cls, path: str, packets: list) -> None:
+        packets = sorted(packets)
+        keyframes = [packet for packet in packets if packet[3] & cls.KEYFRAME]
+        partial = '%s.partial' % path
+        with open(partial, 'wb') as indexfile:
+            indexfile.write(cls.headerStruct.pack(cls.magic, cls.version, cls.recordStruct.size, len(keyframes),
+                                                  len(packets)))
+            for section in (keyframes, packets):
+                total = 0
+                for pts, pos, size, flags in section:
+                    total += size
+                    indexfile.write(cls.recordStruct.pack(pts, pos, size, flags, total))
+        os.replace(partial, path)
+
+    @classmethod
+    def parse(cls, output: str) -> list:
+        packets = []
+        for line in output.splitlines():
+            fields = line.strip().split(',')
+            if len(fields) < 4:
+                continue
+            try:
+                packets.append((float(fields[0]), int(fields[2]) if fields[2].isdigit() else -1, int(fields[1]),
+                                cls.KEYFRAME if 'K' in fields[3] else 0))
+            except ValueError:
+                continue
+        return packets
+
+    def keyframeBefore(self, position: float) -> float:
+        index = bisect_right(self.keyframes, position)
+        return self.keyframes[index - 1] if index > 0 else None
+
+    def keyframeAfter(self, position: float) -> float:
+        index = bisect_left(self.keyframes, position)
+        return self.keyframes[index] if index < self.keyCount else None
+
+    def bytesBetween(self, start: float, end: float) -> int:
+        first, last = bisect_left(self.packets, start), bisect_left(self.packets, end)
+        if last <= first:
+            return 0
+        return self.cumulative[last - 1] - (self.cumulative[first - 1] if first > 0 else 0)
+
+    def close(self) -> None:
+        self.data.close()
+        self.file.close()
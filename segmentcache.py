@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+import shutil
+
+try:
+    from vidcutter.mediasource import MediaSource
+except ImportError:
+    from mediasource import MediaSource
+
+
+class SegmentCache(object):
+    def __init__(self, path: str, maxBytes: int):
+        self.path = path
+        self.maxBytes = maxBytes
+        os.makedirs(self.path, exist_ok=True)
+
+    def key(self, source: str, start: float, end: float, settings: str = '') -> str:
+        ident = '%s|%.6f|%.6f|%s' % (MediaSource.identity(source), start, end, settings)
+        return hashlib.sha1(ident.encode('utf-8')).hexdigest()
+
+    def segmentPath(self, key: str, ext: str) -> str:
+        return os.path.join(self.path, '%s%s' % (key, ext))
+
+    def partialPath(self, key: str, ext: str) -> str:
+        return os.path.join(self.path, '%s.partial%s' % (key, ext))
+
+    def lookup(self, key: str, ext: str) -> str:
+        segment = self.segmentPath(key, ext)
+        if os.path.isfile(segment):
+            os.utime(segment, None)
+            return segment
+        return None
+
+    def commit(self, partial: str, segment: str) -> None:
+        if os.path.isfile(partial):
+            os.replace(partial, segment)
+
+    def hasRoom(self, size: int) -> bool:
+        return size <= self.maxBytes and shutil.disk_usage(self.path).free > 2 * size
+
+    def evict(self) -> None:
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.is_file() and '.partial' not in entry.name:
+                info = entry.stat()
+                entries.append((info.st_mtime, info.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.maxBytes:
+                break
+            os.remove(path)
+            total -= size
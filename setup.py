@@ -86,6 +86,8 @@ setup(
 
     install_requires=get_install_requires(),
 
+    extras_require={'decoder': ['av']},
+
     package_data={'vidcutter': get_package_data()},
 
     data_files=get_data_files(),
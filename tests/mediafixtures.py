@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import struct
+
+
+def mp4Box(boxtype: bytes, *children: bytes) -> bytes:
+    payload = b''.join(children)
+    return struct.pack('>I4s', 8 + len(payload), boxtype) + payload
+
+
+def mp4FullBox(boxtype: bytes, fmt: str, entries: list, version: int = 0, header: bytes = b'') -> bytes:
+    table = b''.join(struct.pack('>' + fmt, *entry) for entry in entries)
+    return mp4Box(boxtype, struct.pack('>B3x', version), header, struct.pack('>I', len(entries)), table)
+
+
+def buildMP4(sizes: list = (100, 50, 60, 70), chunks: list = (1000, 2000), perChunk: int = 2, delta: int = 40,
+             timescale: int = 1000, sync: list = (1, 3), compositions: list = None, edits: list = None,
+             co64: bool = False, mdhd: bool = True, fragmented: bool = False) -> bytes:
+    stbl = [mp4FullBox(b'stsz', 'I', [(size,) for size in sizes], header=struct.pack('>I', 0)),
+            mp4FullBox(b'co64' if co64 else b'stco', 'Q' if co64 else 'I', [(chunk,) for chunk in chunks]),
+            mp4FullBox(b'stsc', 'III', [(1, perChunk, 1)]),
+            mp4FullBox(b'stts', 'II', [(len(sizes), delta)])]
+    if compositions is not None:
+        stbl.append(mp4FullBox(b'ctts', 'Ii', [(1, shift) for shift in compositions]))
+    if sync is not None:
+        stbl.append(mp4FullBox(b'stss', 'I', [(sample,) for sample in sync]))
+    mdia = [mp4Box(b'hdlr', struct.pack('>4x4x4s12x', b'vide')),
+            mp4Box(b'minf', mp4Box(b'stbl', *stbl))]
+    if mdhd:
+        mdia.insert(0, mp4Box(b'mdhd', struct.pack('>4xIIII4x', 0, 0, timescale, sum(sizes))))
+    trak = [mp4Box(b'mdia', *mdia)]
+    if edits is not None:
+        trak.insert(0, mp4Box(b'edts', mp4FullBox(b'elst', 'IiI', [(duration, start, 1 << 16)
+                                                                   for duration, start in edits])))
+    boxes = [mp4Box(b'ftyp', b'isom', struct.pack('>I', 512)), mp4Box(b'moov', mp4Box(b'trak', *trak))]
+    if fragmented:
+        boxes.append(mp4Box(b'moof', mp4Box(b'mfhd', struct.pack('>4xI', 1))))
+    boxes.append(mp4Box(b'mdat', bytes(16)))
+    return b''.join(boxes)
+
+
+def ebmlSize(size: int) -> bytes:
+    length = 1
+    while size >= (1 << (7 * length)) - 1:
+        length += 1
+    return ((1 << (7 * length)) | size).to_bytes(length, 'big')
+
+
+def ebmlElement(elementId: int, *children: bytes, unknownSize: bool = False) -> bytes:
+    payload = b''.join(children)
+    header = elementId.to_bytes((elementId.bit_length() + 7) // 8, 'big')
+    return header + (b'\xff' if unknownSize else ebmlSize(len(payload))) + payload
+
+
+def ebmlUint(elementId: int, value: int) -> bytes:
+    return ebmlElement(elementId, value.to_bytes(max(1, (value.bit_length() + 7) // 8), 'big'))
+
+
+def buildMKV(cues: list, padding: int = 1024, unknownSize: bool = False) -> tuple:
+    tracks = ebmlElement(0x1654AE6B,
+                         ebmlElement(0xAE, ebmlUint(0xD7, 1), ebmlUint(0x83, 1)),
+                         ebmlElement(0xAE, ebmlUint(0xD7, 2), ebmlUint(0x83, 2)))
+    points = [ebmlElement(0xBB, ebmlUint(0xB3, time),
+                          ebmlElement(0xB7, ebmlUint(0xF7, track), ebmlUint(0xF1, cluster)))
+              for time, track, cluster in cues]
+    segment = b''.join([ebmlElement(0x1549A966, ebmlUint(0x2AD7B1, 1000000)), tracks,
+                        ebmlElement(0x1C53BB6B, *points), ebmlElement(0xEC, bytes(padding))])
+    header = ebmlElement(0x1A45DFA3)
+    data = header + ebmlElement(0x18538067, segment, unknownSize=unknownSize)
+    return data, len(data) - len(segment)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+
+from clips import Clip, ClipList
+
+
+def bruteForce(clips: list, start: int, end: int) -> list:
+    return sorted((clip for clip in clips if clip.start < end and clip.end > start), key=lambda clip: clip.start)
+
+
+def testIncompleteClipIsNotIndexed():
+    clips = ClipList()
+    clip = Clip(100)
+    clips.append(clip)
+    assert clips.overlapping(0, 1000) == [] and clips.runtime == 0
+    clips.setEnd(clip, 400)
+    assert clips.covering(100) == [clip] and clips.covering(400) == []
+    assert clips.runtime == 300 and clips.last() is clip
+
+
+def testRowsFollowEdits():
+    clips = ClipList()
+    items = [Clip(start, start + 10) for start in range(0, 50, 10)]
+    for clip in items:
+        clips.append(clip)
+    clips.move(0, 3)
+    removed = clips.remove(1)
+    assert removed is items[2] and removed not in clips
+    assert [clips.index(clip) for clip in clips] == [0, 1, 2, 3]
+    assert list(clips) == [items[1], items[3], items[0], items[4]]
+
+
+def testIntervalIndexMatchesBruteForce():
+    rng = random.Random(2017)
+    clips, reference = ClipList(), []
+    for step in range(2000):
+        action = rng.random()
+        if action < 0.45 or not len(reference):
+            start = rng.randrange(100000)
+            clip = Clip(start, start + rng.choice([rng.randrange(1, 500), rng.randrange(1, 50000)]))
+            clips.append(clip)
+            reference.append(clip)
+        elif action < 0.6:
+            row = rng.randrange(len(reference))
+            assert clips.remove(row) is reference.pop(row)
+        elif action < 0.75:
+            source, destination = rng.randrange(len(reference)), rng.randrange(len(reference))
+            clips.move(source, destination)
+            reference.insert(destination, reference.pop(source))
+        else:
+            clip = rng.choice(reference)
+            clips.setEnd(clip, clip.start + rng.randrange(1, 5000))
+        start = rng.randrange(150000)
+        end = start + rng.randrange(1, 2000)
+        assert [id(clip) for clip in clips.overlapping(start, end)] == \
+            [id(clip) for clip in bruteForce(reference, start, end)]
+        if step % 100 == 0:
+            assert [clips.index(clip) for clip in reference] == list(range(len(reference)))
+            assert clips.runtime == sum(clip.duration() for clip in reference)
+            for clip in reference:
+                assert clips.hasOverlap(clip) == any(other is not clip for other in
+                                                     bruteForce(reference, clip.start, clip.end))
+    clips.clear()
+    assert len(clips) == 0 and clips.overlapping(0, 200000) == []
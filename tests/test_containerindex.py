@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from containerindex import ContainerIndex
+from mediafixtures import buildMKV, buildMP4
+
+
+def readFixture(tmpdir, name: str, data: bytes) -> list:
+    path = tmpdir.join(name)
+    path.write_binary(data)
+    return ContainerIndex.read(str(path))
+
+
+def testMP4SampleTable(tmpdir):
+    assert readFixture(tmpdir, 'plain.mp4', buildMP4()) == [
+        (0.0, 1000, 100, 1), (0.04, 1100, 50, 0), (0.08, 2000, 60, 1), (0.12, 2060, 70, 0)]
+
+
+def testMP4EditListAndCompositionOffsets(tmpdir):
+    packets = readFixture(tmpdir, 'edited.mov', buildMP4(compositions=[80, 80, 80, 80],
+                                                         edits=[(500, -1), (4000, 80)]))
+    assert [pts for pts, _, _, _ in packets] == pytest.approx([0.0, 0.04, 0.08, 0.12])
+
+
+def testMP4WithoutSyncTableIsAllKeyframes(tmpdir):
+    packets = readFixture(tmpdir, 'intra.mp4', buildMP4(sync=None))
+    assert [flags for _, _, _, flags in packets] == [1, 1, 1, 1]
+
+
+def testMP4LargeChunkOffsets(tmpdir):
+    packets = readFixture(tmpdir, 'large.mp4', buildMP4(chunks=[5000000000, 6000000000], co64=True))
+    assert [pos for _, pos, _, _ in packets] == [5000000000, 5000000100, 6000000000, 6000000060]
+
+
+@pytest.mark.parametrize('options', [{'mdhd': False}, {'fragmented': True}, {'sizes': [100, 50, 60, 70, 80]}])
+def testMP4UnusableIndex(tmpdir, options):
+    assert readFixture(tmpdir, 'broken.mp4', buildMP4(**options)) is None
+
+
+def testMP4TruncatedFile(tmpdir):
+    assert readFixture(tmpdir, 'truncated.mp4', buildMP4()[:-30]) is None
+
+
+def testMatroskaCues(tmpdir):
+    data, segment = buildMKV([(2000, 1, 300), (0, 1, 100), (1000, 2, 200)])
+    assert readFixture(tmpdir, 'cues.mkv', data) == [
+        (0.0, segment + 100, 200, 1), (2.0, segment + 300, len(data) - segment - 300, 1)]
+
+
+def testMatroskaUnknownSizeSegment(tmpdir):
+    data, _ = buildMKV([(0, 1, 100)], unknownSize=True)
+    assert readFixture(tmpdir, 'live.webm', data) is None
+
+
+def testMatroskaWithoutVideoCues(tmpdir):
+    data, _ = buildMKV([(0, 2, 100)])
+    assert readFixture(tmpdir, 'audio.mkv', data) is None
+
+
+def testUnsupportedExtension(tmpdir):
+    assert readFixture(tmpdir, 'clip.avi', buildMP4()) is None
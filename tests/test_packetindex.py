@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from packetindex import PacketIndex
+
+
+@pytest.fixture
+def index(tmpdir):
+    path = str(tmpdir.join('clip.v%i.idx' % PacketIndex.version))
+    PacketIndex.write(path, [(1.0, 3000, 400, 0), (0.0, 1000, 1000, PacketIndex.KEYFRAME), (0.5, 2000, 500, 0),
+                             (1.5, 4000, 900, PacketIndex.KEYFRAME), (2.0, 5000, 300, 0)])
+    packetIndex = PacketIndex(path)
+    yield packetIndex
+    packetIndex.close()
+
+
+def testColumns(index):
+    assert list(index.keyframes) == [0.0, 1.5]
+    assert list(index.packets) == [0.0, 0.5, 1.0, 1.5, 2.0]
+    assert list(index.cumulative) == [1000, 1500, 1900, 2800, 3100]
+    assert index.packets[-1] == 2.0
+    with pytest.raises(IndexError):
+        index.packets[5]
+
+
+def testKeyframeLookup(index):
+    assert index.keyframeBefore(1.2) == 0.0
+    assert index.keyframeBefore(1.5) == 1.5
+    assert index.keyframeBefore(-0.1) is None
+    assert index.keyframeAfter(0.1) == 1.5
+    assert index.keyframeAfter(1.6) is None
+
+
+def testBytesBetween(index):
+    assert index.bytesBetween(0.0, 2.5) == 3100
+    assert index.bytesBetween(0.5, 1.5) == 900
+    assert index.bytesBetween(1.2, 1.2) == 0
+    assert index.bytesBetween(2.0, 0.0) == 0
+
+
+def testParseProbeOutput():
+    output = '0.000000,1000,48,K_\n0.040000,200,N/A,__\nN/A,100,1248,__\n\n0.080000,300,1448,__'
+    assert PacketIndex.parse(output) == [(0.0, 48, 1000, PacketIndex.KEYFRAME), (0.04, -1, 200, 0),
+                                         (0.08, 1448, 300, 0)]
+
+
+def testRejectsStaleIndex(tmpdir):
+    path = str(tmpdir.join('stale.idx'))
+    PacketIndex.write(path, [(0.0, 0, 10, PacketIndex.KEYFRAME)])
+    with open(path, 'r+b') as indexfile:
+        indexfile.seek(4)
+        indexfile.write(b'\x01\x00')
+    with pytest.raises(ValueError):
+        PacketIndex(path)
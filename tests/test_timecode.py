@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from fractions import Fraction
+
+from timecode import TimeCode
+
+
+def testFormat():
+    assert TimeCode.format(3723045) == '01:02:03'
+    assert TimeCode.format(3723045, precise=True) == '01:02:03.045'
+    assert TimeCode.format(-5, precise=True) == '00:00:00.000'
+
+
+def testArguments():
+    assert TimeCode.toArg(61005) == '61.005'
+    assert TimeCode.toArg(-250) == '-0.250'
+    assert TimeCode.fromSeconds(1.0005) == 1000
+    assert TimeCode.fromSeconds(2.9996) == 3000
+    assert TimeCode.toSeconds(1500) == 1.5
+
+
+def testFrameFloor():
+    ntsc = Fraction(30000, 1001)
+    assert TimeCode.frameFloor(1001, ntsc) == 1001
+    assert TimeCode.frameFloor(1000, ntsc) == 968
+    assert TimeCode.frameFloor(967, ntsc) == 935
+    assert TimeCode.frameFloor(1234, None) == 1234
+    for rate in (ntsc, Fraction(25), Fraction(24000, 1001), Fraction(60)):
+        for millisecs in range(0, 5000, 7):
+            floor = TimeCode.frameFloor(millisecs, rate)
+            frame = millisecs * rate.numerator // (1000 * rate.denominator)
+            assert floor <= millisecs
+            assert TimeCode.frameFloor(floor, rate) == floor
+            assert floor * rate.numerator // (1000 * rate.denominator) == frame
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+from collections import OrderedDict
+
+from PyQt5.QtCore import QSize
+from PyQt5.QtGui import QImage
+
+try:
+    from vidcutter.mediasource import MediaSource
+except ImportError:
+    from mediasource import MediaSource
+
+
+class ThumbnailCache(object):
+    def __init__(self, path: str, memoryBytes: int, diskBytes: int):
+        self.path = path
+        self.memoryBytes = memoryBytes
+        self.diskBytes = diskBytes
+        self.memory = OrderedDict()
+        self.memoryUsed = 0
+        os.makedirs(self.path, exist_ok=True)
+        self.diskUsed = sum(entry.stat().st_size for entry in os.scandir(self.path) if entry.is_file())
+
+    @staticmethod
+    def key(source: str, position: int, size: QSize, mode: str = '') -> str:
+        ident = '%s|%i|%ix%i|%s' % (MediaSource.identity(source), position, size.width(), size.height(), mode)
+        return hashlib.sha1(ident.encode('utf-8')).hexdigest()
+
+    def filePath(self, key: str) -> str:
+        return os.path.join(self.path, '%s.png' % key)
+
+    def get(self, key: str) -> QImage:
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        path = self.filePath(key)
+        if os.path.isfile(path):
+            image = QImage(path, 'PNG')
+            if not image.isNull():
+                os.utime(path, None)
+                self.remember(key, image)
+                return image
+        return None
+
+    def put(self, key: str, image: QImage) -> None:
+        if image.isNull():
+            return
+        self.remember(key, image)
+        path = self.filePath(key)
+        if not os.path.isfile(path) and image.save(path, 'PNG'):
+            self.diskUsed += os.path.getsize(path)
+            if self.diskUsed > self.diskBytes:
+                self.evict()
+
+    def remember(self, key: str, image: QImage) -> None:
+        if key in self.memory:
+            self.memoryUsed -= self.memory.pop(key).byteCount()
+        self.memory[key] = image
+        self.memoryUsed += image.byteCount()
+        while self.memoryUsed > self.memoryBytes and len(self.memory) > 1:
+            _, oldest = self.memory.popitem(last=False)
+            self.memoryUsed -= oldest.byteCount()
+
+    def evict(self) -> None:
+        entries = sorted((entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                         for entry in os.scandir(self.path) if entry.is_file())
+        self.diskUsed = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.diskUsed <= self.diskBytes * 0.9:
+                break
+            os.remove(path)
+            self.diskUsed -= size
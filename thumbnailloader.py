@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import heapq
+import re
+import shlex
+from collections import deque
+
+from PyQt5.QtCore import QObject, QProcess, QSize, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage
+
+
+class ThumbnailLoader(QObject):
+    thumbnailReady = pyqtSignal(object, QImage)
+
+    def __init__(self, videoService, workers: int = 2, parent=None):
+        super(ThumbnailLoader, self).__init__(parent)
+        self.videoService = videoService
+        self.cache = videoService.thumbnailCache
+        self.workers = max(1, workers)
+        self.queue = []
+        self.running = {}
+        self.counter = 0
+        self.videoService.decoderFrame.connect(self.decoded)
+
+    def request(self, tag: object, source: str, position: int, size: QSize = QSize(100, 70),
+                priority: int = 0, mode: str = None) -> None:
+        mode = mode or self.videoService.FAST
+        size = self.videoService.pixelSize(size)
+        key = self.cache.key(source, position, size, mode)
+        image = self.cache.get(key)
+        if image is not None:
+            image.setDevicePixelRatio(self.videoService.pixelRatio())
+            QTimer.singleShot(0, lambda: self.thumbnailReady.emit(tag, image))
+            return
+        if key in self.running:
+            self.running[key][1].append(tag)
+            return
+        self.counter += 1
+        heapq.heappush(self.queue, (-priority, -self.counter, tag, key, source, position, size, mode))
+        self.startNext()
+
+    def drop(self, tag: object) -> None:
+        self.queue = [entry for entry in self.queue if entry[2] is not tag]
+        heapq.heapify(self.queue)
+        for _, tags in self.running.values():
+            tags[:] = [item for item in tags if item is not tag]
+
+    def clear(self) -> None:
+        self.queue = []
+        for _, tags in self.running.values():
+            del tags[:]
+
+    def startNext(self) -> None:
+        while len(self.running) < self.workers and len(self.queue):
+            _, _, tag, key, source, position, size, mode = heapq.heappop(self.queue)
+            if key in self.running:
+                self.running[key][1].append(tag)
+                continue
+            decoder = self.videoService.decoderThread(source)
+            if decoder is not None:
+                self.running[key] = (None, [tag])
+                decoder.request((self, key), position, size, mode == self.videoService.ACCURATE)
+                continue
+            proc = QProcess(self)
+            proc.setProcessChannelMode(QProcess.SeparateChannels)
+            proc.setWorkingDirectory(self.videoService.getAppPath())
+            proc.finished.connect(lambda code, status, key=key: self.captured(key))
+            if hasattr(proc, 'errorOccurred'):
+                proc.errorOccurred.connect(lambda error, key=key: self.captureError(key, error))
+            self.running[key] = (proc, [tag])
+            proc.start(self.videoService.backend,
+                       shlex.split(self.videoService.captureArgs(source, position, size, mode)))
+
+    def captured(self, key: str) -> None:
+        if key not in self.running:
+            return
+        proc, tags = self.running.pop(key)
+        if proc.exitStatus() == QProcess.NormalExit and proc.exitCode() == 0:
+            self.deliver(key, tags, QImage.fromData(proc.readAllStandardOutput().data(), 'PNG'))
+        proc.deleteLater()
+        self.startNext()
+
+    def decoded(self, token: tuple, image: QImage) -> None:
+        owner, key = token
+        if owner is not self or key not in self.running:
+            return
+        _, tags = self.running.pop(key)
+        self.deliver(key, tags, image)
+        self.startNext()
+
+    def deliver(self, key: str, tags: list, image: QImage) -> None:
+        if image is not None and not image.isNull():
+            self.cache.put(key, image)
+            image.setDevicePixelRatio(self.videoService.pixelRatio())
+            for tag in tags:
+                self.thumbnailReady.emit(tag, image)
+
+    def captureError(self, key: str, error: QProcess.ProcessError) -> None:
+        if error == QProcess.FailedToStart:
+            self.captured(key)
+
+
+class ThumbnailBatch(QObject):
+    frameReady = pyqtSignal(int, QImage)
+    finished = pyqtSignal()
+
+    clusterGap = 10000
+    showinfoRegex = re.compile(r'Parsed_showinfo.*\spts_time:\s*([-0-9.]+)')
+    pngTrailer = b'IEND\xaeB`\x82'
+
+    def __init__(self, videoService, source: str, positions: list, size: QSize, parent=None):
+        super(ThumbnailBatch, self).__init__(parent)
+        self.videoService = videoService
+        self.cache = videoService.thumbnailCache
+        self.source = source
+        self.size = videoService.pixelSize(size)
+        self.startTime = videoService.mediaInfo(source).format.startTime
+        self.images = {}
+        self.cached = []
+        pending = []
+        for position in sorted(set(positions)):
+            image = self.cache.get(self.key(position))
+            if image is None:
+                pending.append(position)
+            else:
+                self.cached.append((position, image))
+        self.clusters = deque(self.cluster(pending, self.clusterGap))
+        self.remaining = deque()
+        self.proc = None
+        self.stdout = b''
+        self.stderr = ''
+        self.frames = deque()
+        self.times = deque()
+        self.decoding = False
+        self.done = False
+        self.videoService.decoderFrame.connect(self.decoded)
+        QTimer.singleShot(0, self.start)
+
+    def key(self, position: int) -> str:
+        return self.cache.key(self.source, position, self.size, self.videoService.ACCURATE)
+
+    @staticmethod
+    def cluster(positions: list, gap: int) -> list:
+        clusters = []
+        for position in positions:
+            if len(clusters) and position - clusters[-1][-1] <= gap:
+                clusters[-1].append(position)
+            else:
+                clusters.append([position])
+        return clusters
+
+    def args(self, cluster: list) -> str:
+        targets = ['%.6f' % (position / 1000 + self.startTime) for position in cluster]
+        select = '+'.join('gte(t,%s)*(isnan(prev_t)+lt(prev_t,%s))' % (target, target) for target in targets)
+        return '-hide_banner -loglevel info -copyts -ss %.6f -i "%s" -an -sn ' \
+               '-vf "select=\'%s\',showinfo,scale=%i:%i:force_original_aspect_ratio=decrease" -vsync 0 ' \
+               '-f image2pipe -vcodec png -compression_level 0 -' \
+               % (cluster[0] / 1000, self.source, select, self.size.width(), self.size.height())
+
+    def start(self) -> None:
+        for position, image in self.cached:
+            self.deliver(position, image)
+        self.nextCluster()
+
+    def nextCluster(self) -> None:
+        if self.done:
+            return
+        if not len(self.clusters):
+            self.done = True
+            self.finished.emit()
+            return
+        cluster = self.clusters.popleft()
+        self.remaining = deque(cluster)
+        decoder = self.videoService.decoderThread(self.source)
+        if decoder is not None:
+            self.decoding = True
+            for position in cluster:
+                decoder.request((self, position), position, self.size, True)
+            return
+        self.stdout, self.stderr = b'', ''
+        self.frames.clear()
+        self.times.clear()
+        self.proc = QProcess(self)
+        self.proc.setProcessChannelMode(QProcess.SeparateChannels)
+        self.proc.setWorkingDirectory(self.videoService.getAppPath())
+        self.proc.readyReadStandardOutput.connect(self.readFrames)
+        self.proc.readyReadStandardError.connect(self.readTimes)
+        self.proc.finished.connect(self.clusterDone)
+        if hasattr(self.proc, 'errorOccurred'):
+            self.proc.errorOccurred.connect(self.clusterError)
+        self.proc.start(self.videoService.backend, shlex.split(self.args(cluster)))
+
+    def readFrames(self) -> None:
+        self.stdout += self.proc.readAllStandardOutput().data()
+        while True:
+            end = self.stdout.find(self.pngTrailer)
+            if end < 0:
+                break
+            end += len(self.pngTrailer)
+            self.frames.append(QImage.fromData(self.stdout[:end], 'PNG'))
+            self.stdout = self.stdout[end:]
+        self.match()
+
+    def readTimes(self) -> None:
+        self.stderr += self.proc.readAllStandardError().data().decode('utf-8', 'replace')
+        lines = self.stderr.split('\n')
+        self.stderr = lines.pop()
+        for line in lines:
+            match = self.showinfoRegex.search(line)
+            if match is not None:
+                self.times.append(float(match.group(1)))
+        self.match()
+
+    def match(self) -> None:
+        while len(self.frames) and len(self.times):
+            image, frametime = self.frames.popleft(), self.times.popleft()
+            while len(self.remaining) and self.remaining[0] / 1000 + self.startTime <= frametime + 0.0005:
+                position = self.remaining.popleft()
+                if not image.isNull():
+                    self.store(position, image)
+        if not len(self.remaining) and self.proc.state() != QProcess.NotRunning:
+            self.proc.kill()
+
+    def store(self, position: int, image: QImage) -> None:
+        self.cache.put(self.key(position), image)
+        self.deliver(position, image)
+
+    def deliver(self, position: int, image: QImage) -> None:
+        image.setDevicePixelRatio(self.videoService.pixelRatio())
+        self.images[position] = image
+        self.frameReady.emit(position, image)
+
+    def decoded(self, token: tuple, image: QImage) -> None:
+        owner, position = token
+        if owner is not self or position not in self.remaining:
+            return
+        self.remaining.remove(position)
+        if not image.isNull():
+            self.store(position, image)
+        if not len(self.remaining):
+            self.decoding = False
+            QTimer.singleShot(0, self.nextCluster)
+
+    def clusterDone(self, *args) -> None:
+        if self.sender() is not self.proc:
+            return
+        self.readTimes()
+        self.readFrames()
+        self.proc.deleteLater()
+        self.proc = None
+        QTimer.singleShot(0, self.nextCluster)
+
+    def clusterError(self, error: QProcess.ProcessError) -> None:
+        if error == QProcess.FailedToStart:
+            self.clusterDone()
+
+    def cancel(self) -> None:
+        self.clusters.clear()
+        self.remaining.clear()
+        if self.decoding:
+            self.decoding = False
+            QTimer.singleShot(0, self.nextCluster)
+        if self.proc is not None and self.proc.state() != QProcess.NotRunning:
+            self.proc.kill()
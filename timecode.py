@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from fractions import Fraction
+
+
+class TimeCode(object):
+    @staticmethod
+    def format(millisecs: int, precise: bool = False) -> str:
+        secs, millis = divmod(max(0, int(millisecs)), 1000)
+        mins, secs = divmod(secs, 60)
+        hours, mins = divmod(mins, 60)
+        text = '%02i:%02i:%02i' % (hours, mins, secs)
+        return '%s.%03i' % (text, millis) if precise else text
+
+    @staticmethod
+    def toArg(millisecs: int) -> str:
+        secs, millis = divmod(abs(int(millisecs)), 1000)
+        return '%s%i.%03i' % ('-' if millisecs < 0 else '', secs, millis)
+
+    @staticmethod
+    def fromSeconds(seconds: float) -> int:
+        return int(round(seconds * 1000))
+
+    @staticmethod
+    def toSeconds(millisecs: int) -> float:
+        return millisecs / 1000
+
+    @staticmethod
+    def frameFloor(millisecs: int, frameRate: Fraction) -> int:
+        if not frameRate:
+            return millisecs
+        frame = (millisecs * frameRate.numerator) // (1000 * frameRate.denominator)
+        return -(-frame * 1000 * frameRate.denominator // frameRate.numerator)
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import base64
+import hashlib
 import os
 import platform
 import re
@@ -10,9 +12,10 @@ import time
 import warnings
 from zipfile import ZipFile
 
-from PyQt5.QtCore import QDir, QFile, QFileInfo, QModelIndex, QPoint, QSize, Qt, QTime, QUrl, pyqtSlot
+from PyQt5.QtCore import (QBuffer, QDir, QFile, QFileInfo, QModelIndex, QPoint, QSettings, QSize, QStandardPaths, Qt,
+                          QTimer, QUrl, pyqtSlot)
 from PyQt5.QtGui import (QCloseEvent, QDesktopServices, QDragEnterEvent, QDropEvent, QFont, QFontDatabase, QIcon,
-                         QKeyEvent, QMouseEvent, QMovie, QPalette, QPixmap, QWheelEvent)
+                         QImage, QKeyEvent, QMouseEvent, QMovie, QPalette, QPixmap, QPixmapCache, QWheelEvent)
 from PyQt5.QtMultimedia import QMediaContent, QMediaPlayer
 from PyQt5.QtMultimediaWidgets import QVideoWidget
 from PyQt5.QtWidgets import (QAbstractItemView, QAction, QApplication, QFileDialog, QGroupBox, QHBoxLayout, QLabel,
@@ -22,14 +25,28 @@ from PyQt5.QtWidgets import (QAbstractItemView, QAction, QApplication, QFileDial
 from qtawesome import icon
 
 try:
+    from vidcutter.clips import Clip, ClipList
+    from vidcutter.exportplanner import ExportPlanner
+    from vidcutter.segmentcache import SegmentCache
+    from vidcutter.thumbnailloader import ThumbnailLoader
+    from vidcutter.timecode import TimeCode
     from vidcutter.updater import Updater
+    from vidcutter.videojobs import JobBatch
     from vidcutter.videoservice import VideoService
     from vidcutter.videoslider import VideoSlider
+    from vidcutter.videotimeline import VideoTimeline
     import vidcutter.resources as resources
 except ImportError:
+    from clips import Clip, ClipList
+    from exportplanner import ExportPlanner
+    from segmentcache import SegmentCache
+    from thumbnailloader import ThumbnailLoader
+    from timecode import TimeCode
     from updater import Updater
+    from videojobs import JobBatch
     from videoservice import VideoService
     from videoslider import VideoSlider
+    from videotimeline import VideoTimeline
     import resources
 
 signal.signal(signal.SIGINT, signal.SIG_DFL)
@@ -68,7 +85,14 @@ class VidCutter(QWidget):
         self.parent = parent
         self.mediaPlayer = QMediaPlayer(None, QMediaPlayer.VideoSurface)
         self.videoWidget = VideoWidget(self)
+        self.settings = QSettings(QSettings.IniFormat, QSettings.UserScope, 'vidcutter', 'vidcutter')
         self.videoService = VideoService(self)
+        self.thumbnailLoader = ThumbnailLoader(self.videoService,
+                                               self.settings.value('thumbnailworkers', 2, type=int), self)
+        self.thumbnailLoader.thumbnailReady.connect(self.setThumbnail)
+        self.segmentCache = SegmentCache(os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation),
+                                                      'segments'),
+                                         self.settings.value('segmentcachesize', 2048, type=int) * 1024 * 1024)
 
         QFontDatabase.addApplicationFont(MainWindow.get_path('fonts/DroidSansMono.ttf'))
         QFontDatabase.addApplicationFont(MainWindow.get_path('fonts/OpenSans.ttf'))
@@ -77,13 +101,20 @@ class VidCutter(QWidget):
         appFont = QFont('Open Sans', fontSize, 300)
         qApp.setFont(appFont)
 
-        self.clipTimes = []
+        self.clipTimes = ClipList()
+        self.cutFiles = []
+        self.exportFiles = []
+        self.pendingSegments = []
+        self.pendingJoin = None
         self.inCut = False
+        self.exporting = False
+        self.exportCancelled = False
+        self.separateFiles = False
         self.movieFilename = ''
         self.movieLoaded = False
-        self.timeformat = 'hh:mm:ss'
         self.finalFilename = ''
         self.totalRuntime = 0
+        self.planPreviews = 50
 
         self.initIcons()
         self.initActions()
@@ -102,6 +133,14 @@ class VidCutter(QWidget):
         self.initMenus()
 
         self.seekSlider = VideoSlider(parent=self, sliderMoved=self.setPosition)
+        self.videoService.filmstripReady.connect(self.setFilmstrip)
+        self.videoService.mediaInfoReady.connect(self.mediaProbed)
+        self.videoService.jobStalled.connect(self.jobStalled)
+        self.thumbnailLoader.thumbnailReady.connect(self.seekSlider.setPreview)
+        self.timeline = VideoTimeline(self.thumbnailLoader, self)
+        self.timeline.hide()
+        self.timeline.seekRequested.connect(self.setPosition)
+        self.timeline.setClips(self.clipTimes)
 
         self.initNoVideo()
 
@@ -114,6 +153,9 @@ class VidCutter(QWidget):
                                     'border-right:1px solid #B9B9B9; } QListView::item { padding:10px 0; }')
         self.cliplist.setFixedWidth(185)
         self.cliplist.model().rowsMoved.connect(self.syncClipList)
+        self.cliplist.verticalScrollBar().valueChanged.connect(self.decorateVisibleRows)
+        self.cliplist.verticalScrollBar().rangeChanged.connect(self.decorateVisibleRows)
+        QPixmapCache.setCacheLimit(self.settings.value('thumbpixmapmemory', 8, type=int) * 1024)
 
         listHeader = QLabel(pixmap=QPixmap(MainWindow.get_path('images/clipindex.png'), 'PNG'),
                             alignment=Qt.AlignCenter)
@@ -188,6 +230,7 @@ class VidCutter(QWidget):
         layout = QVBoxLayout()
         layout.setContentsMargins(10, 10, 10, 4)
         layout.addLayout(self.videoLayout)
+        layout.addWidget(self.timeline)
         layout.addWidget(self.seekSlider)
         layout.addSpacing(5)
         layout.addLayout(controlsLayout)
@@ -240,6 +283,7 @@ class VidCutter(QWidget):
         self.downIcon = icon('ei.caret-down', color='#444')
         self.removeIcon = icon('ei.remove', color='#B41D1D')
         self.removeAllIcon = icon('ei.trash', color='#B41D1D')
+        self.thumbnailIcon = icon('fa.picture-o', color='#999')
         self.successIcon = QIcon(MainWindow.get_path('images/success.png'))
         self.menuIcon = icon('fa.cog', color='#444', scale_factor=1.15)
         self.completePlayIcon = icon('fa.play', color='#444')
@@ -273,6 +317,18 @@ class VidCutter(QWidget):
         self.mediaInfoAction = QAction(self.mediaInfoIcon, 'Media information', self,
                                        statusTip='View current media file information', triggered=self.mediaInfo,
                                        enabled=False)
+        self.singlePassAction = QAction('Single-pass export', self, checkable=True,
+                                        statusTip='Join clips straight from the source without intermediate files',
+                                        checked=self.settings.value('singlepass', False, type=bool),
+                                        toggled=self.setSinglePass)
+        self.separateFilesAction = QAction('Save clips as separate files', self, checkable=True,
+                                           statusTip='Save each clip to its own file instead of joining them',
+                                           checked=self.settings.value('separatefiles', False, type=bool),
+                                           toggled=lambda checked: self.settings.setValue('separatefiles', checked))
+        self.smartCutAction = QAction('Frame-accurate cuts', self, checkable=True,
+                                      statusTip='Re-encode only the partial GOPs at clip edges for exact cut points',
+                                      checked=self.settings.value('smartcut', False, type=bool),
+                                      toggled=lambda checked: self.settings.setValue('smartcut', checked))
         self.updateCheckAction = QAction(self.updateCheckIcon, 'Check for updates...', self,
                                          statusTip='Check for application updates', triggered=self.updateCheck)
         self.aboutQtAction = QAction('About Qt', self, statusTip='About Qt', triggered=qApp.aboutQt)
@@ -290,6 +346,10 @@ class VidCutter(QWidget):
         self.appMenu.addAction(self.mediaInfoAction)
         self.appMenu.addAction(self.updateCheckAction)
         self.appMenu.addSeparator()
+        self.appMenu.addAction(self.singlePassAction)
+        self.appMenu.addAction(self.separateFilesAction)
+        self.appMenu.addAction(self.smartCutAction)
+        self.appMenu.addSeparator()
         self.appMenu.addAction(self.aboutQtAction)
         self.appMenu.addAction(self.aboutAction)
 
@@ -333,27 +393,24 @@ class VidCutter(QWidget):
 
     def moveItemUp(self) -> None:
         index = self.cliplist.currentRow()
-        tmpItem = self.clipTimes[index]
-        del self.clipTimes[index]
-        self.clipTimes.insert(index - 1, tmpItem)
+        self.clipTimes.move(index, index - 1)
         self.renderTimes()
 
     def moveItemDown(self) -> None:
         index = self.cliplist.currentRow()
-        tmpItem = self.clipTimes[index]
-        del self.clipTimes[index]
-        self.clipTimes.insert(index + 1, tmpItem)
+        self.clipTimes.move(index, index + 1)
         self.renderTimes()
 
     def removeItem(self) -> None:
         index = self.cliplist.currentRow()
-        del self.clipTimes[index]
+        self.thumbnailLoader.drop(self.clipTimes.remove(index))
         if self.inCut and index == self.cliplist.count() - 1:
             self.inCut = False
             self.initMediaControls()
         self.renderTimes()
 
     def clearList(self) -> None:
+        self.thumbnailLoader.clear()
         self.clipTimes.clear()
         self.cliplist.clear()
         self.inCut = False
@@ -361,17 +418,33 @@ class VidCutter(QWidget):
         self.initMediaControls()
 
     def mediaInfo(self) -> None:
-        if self.mediaPlayer.isMetaDataAvailable():
+        source = self.mediaPlayer.currentMedia().canonicalUrl().toLocalFile()
+        info = self.videoService.mediaInfo(source)
+        if len(info.streams):
+            rows = [('Container', info.format.formatLongName or info.format.formatName),
+                    ('Duration', TimeCode.format(TimeCode.fromSeconds(info.format.duration))),
+                    ('Size', self.sizeof_fmt(info.format.size)),
+                    ('Bitrate', '%i kb/s' % (info.format.bitRate / 1000))]
+            for stream in info.streams:
+                details = [stream.codecName, stream.profile]
+                if stream.codecType == 'video':
+                    details += ['%i x %i' % (stream.width, stream.height), stream.pixelFormat,
+                                '%.3f fps' % float(stream.frameRate)]
+                elif stream.codecType == 'audio':
+                    details += ['%i Hz' % stream.sampleRate, stream.channelLayout or '%i ch' % stream.channels]
+                if stream.bitRate > 0:
+                    details.append('%i kb/s' % (stream.bitRate / 1000))
+                rows.append(('Stream #%i (%s)' % (stream.index, stream.codecType),
+                             ', '.join(detail for detail in details if detail)))
+            for key, val in sorted(info.format.tags.items()):
+                rows.append((key, val))
             content = '<table cellpadding="4">'
-            for key in self.mediaPlayer.availableMetaData():
-                val = self.mediaPlayer.metaData(key)
-                if type(val) is QSize:
-                    val = '%s x %s' % (val.width(), val.height())
+            for key, val in rows:
                 content += '<tr><td align="right"><b>%s:</b></td><td>%s</td></tr>\n' % (key, val)
             content += '</table>'
             mbox = QMessageBox(windowTitle='Media Information', windowIcon=self.parent.windowIcon(),
                                textFormat=Qt.RichText)
-            mbox.setText('<b>%s</b>' % os.path.basename(self.mediaPlayer.currentMedia().canonicalUrl().toLocalFile()))
+            mbox.setText('<b>%s</b>' % os.path.basename(source))
             mbox.setInformativeText(content)
             mbox.exec_()
         else:
@@ -414,6 +487,10 @@ class VidCutter(QWidget):
                  qApp.organizationDomain(), qApp.organizationDomain())
         QMessageBox.about(self.parent, 'About %s' % qApp.applicationName(), about_html)
 
+    @pyqtSlot(bool)
+    def setSinglePass(self, checked: bool) -> None:
+        self.settings.setValue('singlepass', checked)
+
     def openMedia(self) -> None:
         filename, _ = QFileDialog.getOpenFileName(self.parent, caption='Select video', directory=QDir.homePath())
         if filename != '':
@@ -426,7 +503,13 @@ class VidCutter(QWidget):
         self.mediaPlayer.setMedia(QMediaContent(QUrl.fromLocalFile(filename)))
         self.initMediaControls(True)
         self.cliplist.clear()
-        self.clipTimes = []
+        self.thumbnailLoader.clear()
+        self.clipTimes.clear()
+        self.seekSlider.setFilmstrip(QImage())
+        self.timeline.setSource(filename)
+        self.timeline.show()
+        self.videoService.openDecoder(filename)
+        self.videoService.probeMedia(filename)
         self.parent.setWindowTitle('%s - %s' % (qApp.applicationName(), os.path.basename(filename)))
         if not self.movieLoaded:
             self.videoLayout.replaceWidget(self.novideoWidget, self.videoplayerWidget)
@@ -463,10 +546,8 @@ class VidCutter(QWidget):
 
     def positionChanged(self, progress: int) -> None:
         self.seekSlider.setValue(progress)
-        currentTime = self.deltaToQTime(progress)
-        totalTime = self.deltaToQTime(self.mediaPlayer.duration())
-        self.timeCounter.setText(
-            '%s / %s' % (currentTime.toString(self.timeformat), totalTime.toString(self.timeformat)))
+        self.timeline.setPosition(progress)
+        self.timeCounter.setText('%s / %s' % (TimeCode.format(progress), TimeCode.format(self.mediaPlayer.duration())))
 
     @pyqtSlot()
     def mediaStateChanged(self) -> None:
@@ -477,6 +558,7 @@ class VidCutter(QWidget):
 
     def durationChanged(self, duration: int) -> None:
         self.seekSlider.setRange(0, duration)
+        self.timeline.setDuration(duration)
 
     def muteAudio(self) -> None:
         if self.mediaPlayer.isMuted():
@@ -493,8 +575,15 @@ class VidCutter(QWidget):
     def toggleFullscreen(self) -> None:
         self.videoWidget.setFullScreen(not self.videoWidget.isFullScreen())
 
+    def clipPosition(self) -> int:
+        stream = self.videoService.videoStream(self.movieFilename)
+        return TimeCode.frameFloor(self.mediaPlayer.position(), stream.frameRate if stream is not None else 0)
+
     def setCutStart(self) -> None:
-        self.clipTimes.append([self.deltaToQTime(self.mediaPlayer.position()), '', self.captureImage()])
+        clip = Clip(self.clipPosition())
+        self.clipTimes.append(clip)
+        self.thumbnailLoader.request(clip, self.mediaPlayer.currentMedia().canonicalUrl().toLocalFile(), clip.start,
+                                     priority=1)
         self.cutStartAction.setDisabled(True)
         self.cutEndAction.setEnabled(True)
         self.seekSlider.setRestrictValue(self.seekSlider.value(), True)
@@ -502,13 +591,13 @@ class VidCutter(QWidget):
         self.renderTimes()
 
     def setCutEnd(self) -> None:
-        item = self.clipTimes[len(self.clipTimes) - 1]
-        selected = self.deltaToQTime(self.mediaPlayer.position())
-        if selected.__lt__(item[0]):
+        item = self.clipTimes.last()
+        selected = self.clipPosition()
+        if selected <= item.start:
             QMessageBox.critical(self.parent, 'Invalid END Time',
                                  'The clip end time must come AFTER it\'s start time. Please try again.')
             return
-        item[1] = selected
+        self.clipTimes.setEnd(item, selected)
         self.cutStartAction.setEnabled(True)
         self.cutEndAction.setDisabled(True)
         self.seekSlider.setRestrictValue(0, False)
@@ -521,8 +610,7 @@ class VidCutter(QWidget):
             index = row - 1
         else:
             index = row
-        clip = self.clipTimes.pop(start)
-        self.clipTimes.insert(index, clip)
+        self.clipTimes.move(start, index)
 
     def renderTimes(self) -> None:
         self.cliplist.clear()
@@ -530,90 +618,297 @@ class VidCutter(QWidget):
             self.cliplist.setFixedWidth(200)
         else:
             self.cliplist.setFixedWidth(185)
-        self.totalRuntime = 0
+        self.totalRuntime = self.clipTimes.runtime
         for item in self.clipTimes:
             endItem = ''
-            if type(item[1]) is QTime:
-                endItem = item[1].toString(self.timeformat)
-                self.totalRuntime += item[0].msecsTo(item[1])
+            if item.isComplete():
+                endItem = TimeCode.format(item.end, True)
+                if self.clipTimes.hasOverlap(item):
+                    endItem += '<br/><b style="color:#C00;">OVERLAP</b>'
             listitem = QListWidgetItem()
             listitem.setTextAlignment(Qt.AlignVCenter)
-            if type(item[2]) is QPixmap:
-                listitem.setIcon(QIcon(item[2]))
+            listitem.setIcon(self.thumbnailIcon)
             self.cliplist.addItem(listitem)
             marker = QLabel('''<style>b { font-size:7pt; } p { margin:2px 5px; }</style>
                             <p><b>START</b><br/>%s<br/><b>END</b><br/>%s</p>'''
-                            % (item[0].toString(self.timeformat), endItem))
+                            % (TimeCode.format(item.start, True), endItem))
             marker.setStyleSheet('border:none;')
             self.cliplist.setItemWidget(listitem, marker)
             listitem.setFlags(Qt.ItemIsSelectable | Qt.ItemIsDragEnabled | Qt.ItemIsEnabled)
         if len(self.clipTimes) and not self.inCut:
             self.saveAction.setEnabled(True)
-        if self.inCut or len(self.clipTimes) == 0 or not type(self.clipTimes[0][1]) is QTime:
+        if self.exporting or self.inCut or len(self.clipTimes) == 0 or not self.clipTimes[0].isComplete():
             self.saveAction.setEnabled(False)
-        self.setRunningTime(self.deltaToQTime(self.totalRuntime).toString(self.timeformat))
+        self.setRunningTime(TimeCode.format(self.totalRuntime))
+        self.timeline.update()
+        QTimer.singleShot(0, self.decorateVisibleRows)
+
+    @pyqtSlot()
+    def decorateVisibleRows(self) -> None:
+        viewport = self.cliplist.viewport().rect()
+        for row in range(min(self.cliplist.count(), len(self.clipTimes))):
+            listitem = self.cliplist.item(row)
+            if not viewport.intersects(self.cliplist.visualItemRect(listitem)):
+                continue
+            pixmap = self.thumbnailPixmap(self.clipTimes[row].thumbnail)
+            if pixmap is not None:
+                listitem.setIcon(QIcon(pixmap))
 
     @staticmethod
-    def deltaToQTime(millisecs: int) -> QTime:
-        secs = millisecs / 1000
-        return QTime((secs / 3600) % 60, (secs / 60) % 60, secs % 60, (secs * 1000) % 1000)
+    def thumbnailPixmap(data: bytes) -> QPixmap:
+        if not data:
+            return None
+        key = 'clip-%s' % hashlib.sha1(data).hexdigest()
+        pixmap = QPixmapCache.find(key)
+        if pixmap is None or pixmap.isNull():
+            pixmap = QPixmap()
+            if not pixmap.loadFromData(data, 'JPG'):
+                return None
+            pixmap.setDevicePixelRatio(qApp.devicePixelRatio())
+            QPixmapCache.insert(key, pixmap)
+        return pixmap
 
-    def captureImage(self) -> QPixmap:
-        frametime = self.deltaToQTime(self.mediaPlayer.position()).toString(self.timeformat)
-        inputfile = self.mediaPlayer.currentMedia().canonicalUrl().toLocalFile()
-        imagecap = self.videoService.capture(inputfile, frametime)
-        if type(imagecap) is QPixmap:
-            return imagecap
+    @staticmethod
+    def encodeThumbnail(image: QImage) -> bytes:
+        buffer = QBuffer()
+        buffer.open(QBuffer.WriteOnly)
+        image.save(buffer, 'JPG', 85)
+        return buffer.data().data()
+
+    @pyqtSlot(str, QImage)
+    def setFilmstrip(self, source: str, image: QImage) -> None:
+        if source == self.movieFilename:
+            self.seekSlider.setFilmstrip(image)
+
+    @pyqtSlot(object, QImage)
+    def setThumbnail(self, clip: object, image: QImage) -> None:
+        if isinstance(clip, Clip) and clip in self.clipTimes:
+            clip.thumbnail = self.encodeThumbnail(image)
+            self.decorateVisibleRows()
 
     def cutVideo(self) -> bool:
         clips = len(self.clipTimes)
-        filename, filelist = '', []
+        self.cutFiles = []
         source = self.mediaPlayer.currentMedia().canonicalUrl().toLocalFile()
         _, sourceext = os.path.splitext(source)
-        if clips > 0:
+        if clips > 0 and not self.videoService.hasMediaInfo(source):
+            QMessageBox.information(self.parent, 'Media not ready',
+                                    'The media file is still being analysed. Please try again in a moment.')
+            return False
+        if clips > 0 and not self.exporting:
             self.finalFilename, _ = QFileDialog.getSaveFileName(self.parent, 'Save video', source,
                                                                 'Video files (*%s)' % sourceext)
             if self.finalFilename == '':
                 return False
             qApp.setOverrideCursor(Qt.BusyCursor)
+            smartcut = self.smartCutAction.isChecked()
+            tolerance = 0.0 if smartcut else self.settings.value('cuttolerance', -1.0, type=float)
+            plans = ExportPlanner(self.videoService, tolerance).plan(
+                source, [(TimeCode.toSeconds(clip.start), TimeCode.toSeconds(clip.end)) for clip in self.clipTimes])
+            qApp.restoreOverrideCursor()
+            if not self.confirmPlan(source, plans):
+                return False
+            qApp.setOverrideCursor(Qt.BusyCursor)
+            self.exporting = True
+            self.exportCancelled = False
             self.saveAction.setDisabled(True)
-            self.showProgress(clips)
+            self.showProgress()
             file, ext = os.path.splitext(self.finalFilename)
-            index = 1
-            self.progress.setLabelText('Cutting media files...')
-            qApp.processEvents()
-            for clip in self.clipTimes:
-                duration = self.deltaToQTime(clip[0].msecsTo(clip[1])).toString(self.timeformat)
-                filename = '%s_%s%s' % (file, '{0:0>2}'.format(index), ext)
-                filelist.append(filename)
-                self.videoService.cut(source, filename, clip[0].toString(self.timeformat), duration)
-                index += 1
-            if len(filelist) > 1:
-                self.joinVideos(filelist, self.finalFilename)
+            strategies = [plan.strategy for plan in plans]
+            self.separateFiles = self.separateFilesAction.isChecked()
+            if clips > 1 and self.singlePassAction.isChecked() and not self.separateFiles \
+                    and set(strategies) == {ExportPlanner.COPY}:
+                self.setProgressStage('Joining media files...', 0.0, 1.0)
+                cliplist = [(clip.start, clip.end) for clip in self.clipTimes]
+                job = self.videoService.concatClips(source, cliplist, self.finalFilename)
+                job.progress.connect(self.updateProgress)
+                job.finished.connect(self.finishCut)
+                job.failed.connect(self.cutFailed)
+                return True
+            joining = clips > 1 and not self.separateFiles
+            self.setProgressStage('Cutting media files...', 0.0, 0.5 if joining else 1.0)
+            cutlist, cutStrategies, copies, self.pendingSegments = [], [], [], []
+            if self.separateFiles:
+                self.exportFiles = ['%s_%s%s' % (file, '{0:0>2}'.format(index + 1), ext) for index in range(clips)]
             else:
-                QFile.remove(self.finalFilename)
-                QFile.rename(filename, self.finalFilename)
-            self.progress.setLabelText('Complete...')
-            self.progress.setValue(100)
-            qApp.processEvents()
-            self.progress.close()
-            self.progress.deleteLater()
-            qApp.restoreOverrideCursor()
-            self.complete()
+                self.exportFiles = [self.finalFilename]
+            for index, (clip, plan) in enumerate(zip(self.clipTimes, plans)):
+                start, end = TimeCode.toSeconds(clip.start), TimeCode.toSeconds(clip.end)
+                key = self.segmentCache.key(source, start, end, '%s|%s' % (plan.strategy, ext))
+                segment = self.segmentCache.segmentPath(key, ext)
+                partial = self.segmentCache.partialPath(key, ext)
+                cached = self.segmentCache.lookup(key, ext) is not None
+                if joining:
+                    if not cached and segment not in self.cutFiles:
+                        cutlist.append((partial, clip.start, clip.end))
+                        cutStrategies.append(plan.strategy)
+                        self.pendingSegments.append((partial, segment, index + 1))
+                    self.cutFiles.append(segment)
+                    continue
+                target = self.exportFiles[index]
+                if cached:
+                    copies.append(self.videoService.remux(segment, target, end - start))
+                else:
+                    cutlist.append((target, clip.start, clip.end))
+                    cutStrategies.append(plan.strategy)
+                self.pendingSegments.append((target, segment if not cached else None, index + 1))
+                self.cutFiles.append(target)
+            if len(cutlist) and self.separateFiles and set(cutStrategies) == {ExportPlanner.COPY}:
+                jobs = [self.videoService.extractClips(source, cutlist)]
+            else:
+                jobs = self.videoService.cutJobs(source, cutlist, strategies=cutStrategies)
+            batch = JobBatch(jobs + copies, self)
+            batch.progress.connect(self.updateProgress)
+            batch.finished.connect(self.clipsCut)
             return True
         return False
 
+    def confirmPlan(self, source: str, plans: list) -> bool:
+        mbox = QMessageBox(windowTitle='Export Plan', windowIcon=self.parent.windowIcon(), textFormat=Qt.RichText)
+        mbox.setText('<b>%i clip(s) will be exported as follows:</b>' % len(plans))
+        previews = {}
+        mbox.setInformativeText(self.planContent(plans, previews))
+        batch = self.videoService.captureBatch(source, [TimeCode.fromSeconds(plan.start)
+                                                        for plan in plans[:self.planPreviews]], QSize(64, 36))
+        batch.frameReady.connect(lambda position, image: self.addPlanPreview(mbox, plans, previews, position, image))
+        export = mbox.addButton('Export', QMessageBox.AcceptRole)
+        mbox.addButton(QMessageBox.Cancel)
+        mbox.setDefaultButton(export)
+        mbox.exec_()
+        batch.cancel()
+        batch.deleteLater()
+        return mbox.clickedButton() is export
+
+    def addPlanPreview(self, mbox: QMessageBox, plans: list, previews: dict, position: int, image: QImage) -> None:
+        data = base64.b64encode(self.encodeThumbnail(image)).decode('ascii')
+        previews[position] = '<img src="data:image/jpeg;base64,%s" width="64"/>' % data
+        mbox.setInformativeText(self.planContent(plans, previews))
+
+    def planContent(self, plans: list, previews: dict) -> str:
+        content = '<table cellpadding="3"><tr><th>#</th><th>First frame</th><th>Clip</th><th>Method</th><th>Time</th>' \
+                  '<th>Size</th></tr>'
+        for index, plan in enumerate(plans):
+            start = TimeCode.format(TimeCode.fromSeconds(plan.start), True)
+            end = TimeCode.format(TimeCode.fromSeconds(plan.end), True)
+            preview = previews.get(TimeCode.fromSeconds(plan.start), '') if index < self.planPreviews else ''
+            content += '<tr><td align="right">%i</td><td>%s</td><td>%s - %s</td><td>%s</td>' \
+                       % (index + 1, preview, start, end, plan.strategy)
+            content += '<td align="right">%.1fs</td>' % plan.seconds
+            content += '<td align="right">%s</td></tr>' % self.sizeof_fmt(plan.bytes)
+        content += '</table><p><b>Estimated:</b> %.1f seconds, %s written</p>' \
+                   % (sum(plan.seconds for plan in plans), self.sizeof_fmt(sum(plan.bytes for plan in plans)))
+        return content
+
+    @pyqtSlot(list)
+    def clipsCut(self, jobs: list) -> None:
+        self.sender().deleteLater()
+        failed = [job for job in jobs if not job.success]
+        if len(failed):
+            clipnumbers = {output: number for output, _, number in self.pendingSegments}
+            self.cutFailed('<p>The following clips could not be cut:</p><p>%s</p>'
+                           % '<br/>'.join('<b>Clip %i</b>: %s' % (clipnumbers[job.outputs[0]], job.error)
+                                          for job in failed))
+            return
+        for output, segment, _ in self.pendingSegments:
+            if output in self.exportFiles:
+                if segment is not None:
+                    self.fillSegment(output, segment)
+            else:
+                self.segmentCache.commit(output, segment)
+        self.pendingSegments = []
+        if not self.separateFiles and len(self.cutFiles) > 1:
+            self.joinVideos(self.cutFiles, self.finalFilename)
+        else:
+            self.finishCut()
+
+    def fillSegment(self, output: str, segment: str) -> None:
+        if not os.path.isfile(output) or not self.segmentCache.hasRoom(os.path.getsize(output)):
+            return
+        partial = '%s.partial%s' % os.path.splitext(segment)
+        job = self.videoService.remux(output, partial, background=True)
+        job.finished.connect(lambda: self.segmentCache.commit(partial, segment))
+        job.finished.connect(self.segmentCache.evict)
+
+    @pyqtSlot()
+    def cancelCut(self) -> None:
+        if self.exporting and not self.exportCancelled:
+            self.exportCancelled = True
+            self.progress.setLabelText('Cancelling...')
+            self.videoService.cancelAll()
+
+    @pyqtSlot(str)
+    def cutFailed(self, error: str) -> None:
+        for output, _, _ in self.pendingSegments:
+            if output not in self.exportFiles and os.path.isfile(output):
+                QFile.remove(output)
+        self.pendingSegments = []
+        self.exporting = False
+        self.progress.close()
+        self.progress.deleteLater()
+        qApp.restoreOverrideCursor()
+        self.saveAction.setEnabled(True)
+        if not self.exportCancelled:
+            QMessageBox.critical(self.parent, 'Error cutting media', error)
+
+    @pyqtSlot()
+    def finishCut(self) -> None:
+        if self.separateFiles:
+            self.finalFilename = self.exportFiles[0]
+        self.segmentCache.evict()
+        self.exporting = False
+        self.progress.setLabelText('Complete...')
+        self.progress.setValue(self.progress.maximum())
+        qApp.processEvents()
+        self.progress.close()
+        self.progress.deleteLater()
+        qApp.restoreOverrideCursor()
+        self.complete()
+
+    @pyqtSlot(str)
+    def mediaProbed(self, source: str) -> None:
+        if source == self.movieFilename:
+            self.videoService.buildPacketIndex(source)
+            self.videoService.filmstrip(source)
+        if self.pendingJoin is not None:
+            self.pendingJoin[2].discard(source)
+            self.checkJoin()
+
     def joinVideos(self, joinlist: list, filename: str) -> None:
+        self.pendingJoin = (joinlist, filename, {file for file in joinlist
+                                                 if not self.videoService.hasMediaInfo(file)})
+        for file in list(self.pendingJoin[2]):
+            self.videoService.probeMedia(file)
+        self.checkJoin()
+
+    def checkJoin(self) -> None:
+        joinlist, filename, pending = self.pendingJoin
+        if len(pending):
+            return
+        self.pendingJoin = None
+        if self.exportCancelled:
+            self.cutFailed('Join cancelled')
+            return
+        problems = self.videoService.joinProblems(joinlist)
+        if len(problems):
+            answer = QMessageBox.warning(self.parent, 'Incompatible clips',
+                                         '<p>Some clips do not match the first clip and may not join cleanly:</p>' +
+                                         '<p>%s</p><p>Join them anyway?</p>' % '<br/>'.join(problems),
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if answer != QMessageBox.Yes:
+                self.exportCancelled = True
+                self.cutFailed('Join cancelled')
+                return
+        self.setProgressStage('Joining media files...', 0.5, 1.0)
         listfile = os.path.normpath(os.path.join(os.path.dirname(joinlist[0]), '.vidcutter.list'))
         fobj = open(listfile, 'w')
         for file in joinlist:
             fobj.write('file \'%s\'\n' % file.replace("'", "\\'"))
         fobj.close()
-        self.videoService.join(listfile, filename)
-        QFile.remove(listfile)
-        for file in joinlist:
-            if os.path.isfile(file):
-                QFile.remove(file)
+        job = self.videoService.join(listfile, filename, self.totalRuntime / 1000)
+        job.progress.connect(self.updateProgress)
+        job.tempfiles.append(listfile)
+        job.finished.connect(self.finishCut)
+        job.failed.connect(self.cutFailed)
 
     def updateCheck(self) -> None:
         self.updater = Updater()
@@ -627,14 +922,41 @@ class VidCutter(QWidget):
         else:
             Updater.notify_no_update(self)
 
-    def showProgress(self, steps: int, label: str = 'Analyzing media...') -> None:
-        self.progress = QProgressDialog(label, None, 0, steps, self.parent, windowModality=Qt.ApplicationModal,
-                                        windowIcon=self.parent.windowIcon(), minimumDuration=0, minimumWidth=500)
+    def showProgress(self, label: str = 'Analyzing media...') -> None:
+        self.progress = QProgressDialog(label, 'Cancel', 0, 1000, self.parent, windowModality=Qt.NonModal,
+                                        windowIcon=self.parent.windowIcon(), minimumDuration=0, minimumWidth=500,
+                                        autoReset=False, autoClose=False)
+        self.progress.canceled.connect(self.cancelCut)
+        self.progressStarted = time.monotonic()
+        self.setProgressStage(label, 0.0, 1.0)
         self.progress.show()
-        for i in range(steps):
-            self.progress.setValue(i)
-            qApp.processEvents()
-            time.sleep(1)
+
+    def setProgressStage(self, label: str, start: float, end: float) -> None:
+        self.progressStage = (label, start, end, time.monotonic())
+        self.progress.setLabelText(label)
+        self.progress.setValue(int(start * self.progress.maximum()))
+
+    @pyqtSlot(object)
+    def jobStalled(self, job: object) -> None:
+        if self.exporting:
+            self.progress.setLabelText('%s\n%s' % (self.progressStage[0], job.error))
+
+    @pyqtSlot(float)
+    def updateProgress(self, value: float) -> None:
+        label, start, end, stageStarted = self.progressStage
+        overall = start + (end - start) * value
+        self.progress.setValue(int(overall * self.progress.maximum()))
+        now = time.monotonic()
+        details = ['%i%% complete' % (overall * 100)]
+        task = self.sender()
+        if now > stageStarted and task.bytesWritten() > 0:
+            details.append('%s/s' % self.sizeof_fmt(task.bytesWritten() / (now - stageStarted)))
+        if task.realtimeSpeed() > 0:
+            details.append('%.1fx' % task.realtimeSpeed())
+        if overall > 0:
+            eta = (now - self.progressStarted) * (1 - overall) / overall
+            details.append('ETA %s' % TimeCode.format(int(eta * 1000)))
+        self.progress.setLabelText('%s\n%s' % (label, '  |  '.join(details)))
 
     def complete(self) -> None:
         info = QFileInfo(self.finalFilename)
@@ -660,7 +982,7 @@ class VidCutter(QWidget):
         </tr>
     </table><br/>''' % (
             QDir.toNativeSeparators(self.finalFilename), self.sizeof_fmt(int(info.size())),
-            self.deltaToQTime(self.totalRuntime).toString(self.timeformat)))
+            TimeCode.format(self.totalRuntime)))
         play = mbox.addButton('Play', QMessageBox.AcceptRole)
         play.setIcon(self.completePlayIcon)
         play.clicked.connect(self.openResult)
@@ -702,6 +1024,10 @@ class VidCutter(QWidget):
         self.clearList()
         self.seekSlider.setValue(0)
         self.seekSlider.setRange(0, 0)
+        self.seekSlider.setFilmstrip(QImage())
+        self.timeline.setSource('')
+        self.timeline.hide()
+        self.videoService.closeDecoder()
         self.mediaPlayer.setMedia(QMediaContent())
         self.initNoVideo()
         self.videoLayout.replaceWidget(self.videoplayerWidget, self.novideoWidget)
@@ -807,9 +1133,13 @@ class MainWindow(QMainWindow):
         return os.path.exists(MainWindow.get_path('bin/ffmpeg.exe', override=True))
 
     def restart(self):
-        self.cutter.deleteLater()
+        self.closeCutter()
         self.init_cutter()
 
+    def closeCutter(self) -> None:
+        self.cutter.videoService.closeDecoder()
+        self.cutter.deleteLater()
+
     def dragEnterEvent(self, event: QDragEnterEvent) -> None:
         if event.mimeData().hasUrls():
             event.accept()
@@ -820,7 +1150,7 @@ class MainWindow(QMainWindow):
         event.accept()
 
     def closeEvent(self, event: QCloseEvent) -> None:
-        self.cutter.deleteLater()
+        self.closeCutter()
         self.deleteLater()
         qApp.quit()
 
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import shlex
+import time
+from collections import deque
+
+from PyQt5.QtCore import QObject, QProcess, QTimer, pyqtSignal, pyqtSlot
+
+
+class VideoJob(QObject):
+    started = pyqtSignal()
+    progress = pyqtSignal(float)
+    stalled = pyqtSignal()
+    finished = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    progressRegex = re.compile(r'^([a-z_0-9]+)=\s*(\S*)$')
+
+    def __init__(self, cmd: str, args: str, workdir: str, duration: float = 0.0, parent=None):
+        super(VideoJob, self).__init__(parent)
+        self.cmd = cmd
+        self.args = args
+        self.duration = duration
+        self.output = ''
+        self.lines = []
+        self.buffer = ''
+        self.outTime = 0.0
+        self.speedFactor = 0.0
+        self.totalSize = 0
+        self.error = ''
+        self.success = False
+        self.done = False
+        self.cancelled = False
+        self.fraction = 0.0
+        self.tempfiles = []
+        self.outputs = []
+        self.stallTimeout = 0
+        self.lastAdvance = (0.0, 0, time.monotonic())
+        self.watchdog = QTimer(self, interval=1000)
+        self.watchdog.timeout.connect(self.checkStalled)
+        self.proc = QProcess(self)
+        self.proc.setProcessChannelMode(QProcess.MergedChannels)
+        self.proc.setWorkingDirectory(workdir)
+        self.proc.readyReadStandardOutput.connect(self.readOutput)
+        self.proc.finished.connect(self.procFinished)
+        if hasattr(self.proc, 'errorOccurred'):
+            self.proc.errorOccurred.connect(self.procError)
+
+    def start(self) -> None:
+        self.proc.start(self.cmd, shlex.split(self.args))
+        if self.stallTimeout > 0:
+            self.lastAdvance = (self.outTime, self.totalSize, time.monotonic())
+            self.watchdog.start()
+        self.started.emit()
+
+    def cancel(self) -> None:
+        if self.done:
+            return
+        self.cancelled = True
+        self.error = 'Cancelled'
+        if self.isRunning():
+            self.proc.kill()
+        else:
+            self.complete(False)
+
+    def isRunning(self) -> bool:
+        return self.proc.state() != QProcess.NotRunning
+
+    @pyqtSlot()
+    def checkStalled(self) -> None:
+        outTime, totalSize, lastTime = self.lastAdvance
+        now = time.monotonic()
+        if (outTime, totalSize) != (self.outTime, self.totalSize):
+            self.lastAdvance = (self.outTime, self.totalSize, now)
+        elif now - lastTime > self.stallTimeout and self.isRunning():
+            self.watchdog.stop()
+            self.error = 'Stalled: no progress for %i seconds' % self.stallTimeout
+            self.stalled.emit()
+            self.proc.kill()
+
+    @pyqtSlot()
+    def readOutput(self) -> None:
+        self.buffer += self.proc.readAllStandardOutput().data().decode('utf-8', 'replace')
+        lines = self.buffer.split('\n')
+        self.buffer = lines.pop()
+        for line in lines:
+            match = self.progressRegex.match(line.strip())
+            if match is None:
+                self.lines.append(line)
+            else:
+                self.parseProgress(*match.groups())
+
+    def parseProgress(self, key: str, value: str) -> None:
+        try:
+            if key == 'out_time':
+                hours, mins, secs = value.lstrip('-').split(':')
+                self.outTime = int(hours) * 3600 + int(mins) * 60 + float(secs)
+            elif key == 'speed' and value.endswith('x'):
+                self.speedFactor = float(value[:-1])
+            elif key == 'total_size':
+                self.totalSize = int(value)
+            elif key == 'progress' and self.duration > 0:
+                self.fraction = min(1.0, self.outTime / self.duration)
+                self.progress.emit(self.fraction)
+        except ValueError:
+            pass
+
+    def bytesWritten(self) -> int:
+        return self.totalSize
+
+    def realtimeSpeed(self) -> float:
+        return self.speedFactor if self.isRunning() else 0.0
+
+    @pyqtSlot(int, QProcess.ExitStatus)
+    def procFinished(self, code: int, status: QProcess.ExitStatus) -> None:
+        self.readOutput()
+        self.lines.append(self.buffer)
+        self.output = '\n'.join(self.lines)
+        success = status == QProcess.NormalExit and code == 0
+        if not success and not len(self.error):
+            lines = self.output.strip().splitlines()
+            self.error = lines[-1] if len(lines) else 'Process exited with code %i' % code
+        self.complete(success)
+
+    @pyqtSlot(QProcess.ProcessError)
+    def procError(self, error: QProcess.ProcessError) -> None:
+        if not len(self.error):
+            self.error = self.proc.errorString()
+        if error == QProcess.FailedToStart:
+            self.complete(False)
+
+    def complete(self, success: bool) -> None:
+        if self.done:
+            return
+        self.done = True
+        self.success = success
+        self.watchdog.stop()
+        for file in self.tempfiles + ([] if success else self.outputs):
+            if os.path.isfile(file):
+                os.remove(file)
+        if success:
+            self.fraction = 1.0
+            self.progress.emit(1.0)
+            self.finished.emit()
+        else:
+            self.failed.emit(self.error)
+
+
+class JobChain(QObject):
+    started = pyqtSignal()
+    progress = pyqtSignal(float)
+    stalled = pyqtSignal()
+    finished = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, stages: list, duration: float = 0.0, parent=None):
+        super(JobChain, self).__init__(parent)
+        self.stages = deque(stages)
+        self.stageCount = max(1, len(stages))
+        self.duration = duration
+        self.jobs = []
+        self.current = []
+        self.pending = 0
+        self.error = ''
+        self.success = False
+        self.done = False
+        self.cancelled = False
+        self.aborted = False
+        self.fraction = 0.0
+        self.tempfiles = []
+        self.outputs = []
+        QTimer.singleShot(0, self.nextStage)
+
+    def nextStage(self) -> None:
+        if self.done:
+            return
+        if self.aborted or not len(self.stages):
+            self.complete(not self.aborted)
+            return
+        if not len(self.jobs):
+            self.started.emit()
+        self.current = [factory() for factory in self.stages.popleft()]
+        self.jobs += self.current
+        self.pending = len(self.current)
+        for job in self.current:
+            job.progress.connect(self.jobProgress)
+            job.stalled.connect(self.stalled)
+            job.finished.connect(self.jobDone)
+            job.failed.connect(self.jobFailed)
+        if not self.pending:
+            self.nextStage()
+
+    @pyqtSlot(float)
+    def jobProgress(self, value: float) -> None:
+        stage = self.stageCount - len(self.stages) - 1
+        current = sum(job.fraction for job in self.current) / max(1, len(self.current))
+        self.fraction = (stage + current) / self.stageCount
+        self.progress.emit(self.fraction)
+
+    @pyqtSlot()
+    def jobDone(self) -> None:
+        self.pending -= 1
+        if self.pending == 0:
+            self.nextStage()
+
+    @pyqtSlot(str)
+    def jobFailed(self, error: str) -> None:
+        if self.done:
+            return
+        if not len(self.error):
+            self.error = error
+        self.abort()
+        self.jobDone()
+
+    def cancel(self) -> None:
+        if self.done:
+            return
+        self.cancelled = True
+        self.error = 'Cancelled'
+        self.abort()
+        if not self.pending:
+            self.complete(False)
+
+    def abort(self) -> None:
+        if self.aborted:
+            return
+        self.aborted = True
+        self.stages.clear()
+        for job in self.current:
+            job.cancel()
+
+    def isRunning(self) -> bool:
+        return not self.done and len(self.jobs) > 0
+
+    def bytesWritten(self) -> int:
+        return sum(job.bytesWritten() for job in self.jobs)
+
+    def realtimeSpeed(self) -> float:
+        return sum(job.realtimeSpeed() for job in self.current)
+
+    def complete(self, success: bool) -> None:
+        if self.done:
+            return
+        self.done = True
+        self.success = success
+        for file in self.tempfiles + ([] if success else self.outputs):
+            if os.path.isfile(file):
+                os.remove(file)
+        if success:
+            self.fraction = 1.0
+            self.progress.emit(1.0)
+            self.finished.emit()
+        else:
+            self.failed.emit(self.error)
+
+
+class JobBatch(QObject):
+    progress = pyqtSignal(float)
+    finished = pyqtSignal(list)
+
+    def __init__(self, jobs: list, parent=None):
+        super(JobBatch, self).__init__(parent)
+        self.jobs = jobs
+        self.pending = len(jobs)
+        self.fractions = [0.0] * len(jobs)
+        for index, job in enumerate(jobs):
+            job.progress.connect(lambda value, index=index: self.jobProgress(index, value))
+            job.finished.connect(self.jobDone)
+            job.failed.connect(self.jobDone)
+        if not self.pending:
+            QTimer.singleShot(0, lambda: self.finished.emit(self.jobs))
+
+    def jobProgress(self, index: int, value: float) -> None:
+        self.fractions[index] = value
+        weights = [max(job.duration, 0.001) for job in self.jobs]
+        self.progress.emit(sum(w * f for w, f in zip(weights, self.fractions)) / sum(weights))
+
+    def bytesWritten(self) -> int:
+        return sum(job.bytesWritten() for job in self.jobs)
+
+    def realtimeSpeed(self) -> float:
+        return sum(job.realtimeSpeed() for job in self.jobs)
+
+    def jobDone(self, *args) -> None:
+        self.pending -= 1
+        if self.pending == 0:
+            self.finished.emit(self.jobs)
+
+
+class JobPool(QObject):
+    jobFinished = pyqtSignal(object)
+    done = pyqtSignal()
+
+    def __init__(self, workers: int = 1, parent=None):
+        super(JobPool, self).__init__(parent)
+        self.workers = max(1, workers)
+        self.queue = deque()
+        self.running = []
+
+    def setWorkers(self, workers: int) -> None:
+        self.workers = max(1, workers)
+        self.startNext()
+
+    def submit(self, job: VideoJob) -> VideoJob:
+        job.finished.connect(lambda job=job: self.jobDone(job))
+        job.failed.connect(lambda error, job=job: self.jobDone(job))
+        self.queue.append(job)
+        QTimer.singleShot(0, self.startNext)
+        return job
+
+    def startNext(self) -> None:
+        while len(self.running) < self.workers and len(self.queue):
+            job = self.queue.popleft()
+            if job.done:
+                continue
+            self.running.append(job)
+            job.start()
+
+    def cancelAll(self) -> None:
+        for job in list(self.queue) + self.running:
+            job.cancel()
+
+    def jobDone(self, job: VideoJob) -> None:
+        if job in self.running:
+            self.running.remove(job)
+        elif job in self.queue:
+            self.queue.remove(job)
+        self.jobFinished.emit(job)
+        self.startNext()
+        if self.isIdle():
+            self.done.emit()
+
+    def isIdle(self) -> bool:
+        return not len(self.running) and not len(self.queue)
@@ -2,66 +2,451 @@
 # -*- coding: utf-8 -*-
 
 import os
-import shlex
 import sys
+from bisect import bisect_left, bisect_right
 
-from PyQt5.QtCore import QDir, QFileInfo, QObject, QProcess, QTemporaryFile, pyqtSlot
-from PyQt5.QtGui import QPixmap
-from PyQt5.QtWidgets import QMessageBox
+from PyQt5.QtCore import QDir, QEventLoop, QFileInfo, QObject, QSize, QStandardPaths, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage
+from PyQt5.QtWidgets import qApp
+
+try:
+    from vidcutter.containerindex import ContainerIndex
+    from vidcutter.decodersession import DecoderSession, DecoderThread
+    from vidcutter.mediaprobe import MediaInfo, MediaProbe, StreamInfo
+    from vidcutter.packetindex import PacketIndex
+    from vidcutter.thumbnailcache import ThumbnailCache
+    from vidcutter.thumbnailloader import ThumbnailBatch
+    from vidcutter.timecode import TimeCode
+    from vidcutter.videojobs import JobBatch, JobChain, JobPool, VideoJob
+except ImportError:
+    from containerindex import ContainerIndex
+    from decodersession import DecoderSession, DecoderThread
+    from mediaprobe import MediaInfo, MediaProbe, StreamInfo
+    from packetindex import PacketIndex
+    from thumbnailcache import ThumbnailCache
+    from thumbnailloader import ThumbnailBatch
+    from timecode import TimeCode
+    from videojobs import JobBatch, JobChain, JobPool, VideoJob
 
 
 class VideoService(QObject):
+    encoders = {
+        'h264': 'libx264',
+        'hevc': 'libx265',
+        'mpeg1video': 'mpeg1video',
+        'mpeg2video': 'mpeg2video',
+        'mpeg4': 'mpeg4',
+        'vp8': 'libvpx',
+        'vp9': 'libvpx-vp9',
+        'av1': 'libaom-av1'
+    }
+    profiles = ('baseline', 'main', 'high', 'high10', 'high422', 'high444', 'main10', 'mainstillpicture')
+    FAST, ACCURATE = 'fast', 'accurate'
+
+    jobStarted = pyqtSignal(object)
+    jobProgress = pyqtSignal(object, float)
+    jobStalled = pyqtSignal(object)
+    jobFinished = pyqtSignal(object)
+    jobFailed = pyqtSignal(object, str)
+    filmstripReady = pyqtSignal(str, QImage)
+    mediaInfoReady = pyqtSignal(str)
+    decoderFrame = pyqtSignal(object, QImage)
+
     def __init__(self, parent):
         super(VideoService, self).__init__(parent)
         self.parent = parent
-        self.consoleOutput = ''
         self.backend = 'ffmpeg'
+        self.probe = 'ffprobe'
         if sys.platform == 'win32':
             self.backend = os.path.join(self.getAppPath(), 'bin', 'ffmpeg.exe')
-        self.initProc()
+            self.probe = os.path.join(self.getAppPath(), 'bin', 'ffprobe.exe')
+        self.packetIndexes = {}
+        self.indexJobs = {}
+        self.indexPath = os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), 'index')
+        os.makedirs(self.indexPath, exist_ok=True)
+        self.chains = []
+        self.workers = self.parent.settings.value('workers', 0, type=int)
+        self.stallTimeout = self.parent.settings.value('stalltimeout', 60, type=int)
+        self.thumbnailCache = ThumbnailCache(
+            os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), 'thumbnails'),
+            self.parent.settings.value('thumbcachememory', 32, type=int) * 1024 * 1024,
+            self.parent.settings.value('thumbcachesize', 256, type=int) * 1024 * 1024)
+        self.mediaProbe = MediaProbe(os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation),
+                                                  'probe'))
+        self.probeJobs = {}
+        self.pool = JobPool(self.workers if self.workers > 0 else self.defaultWorkers(QDir.homePath()), self)
+        self.backgroundPool = JobPool(1, self)
+        self.decoder = None
+        self.useDecoder = self.parent.settings.value('inprocessdecoder', True, type=bool)
+
+    def submit(self, args: str, cmd: str = None, duration: float = 0.0, background: bool = False) -> VideoJob:
+        stallTimeout = 0
+        if cmd is None:
+            cmd, args = self.backend, '-nostats -progress pipe:1 %s' % args
+            stallTimeout = 0 if background else self.stallTimeout
+        job = VideoJob(cmd, args, self.getAppPath(), duration, self)
+        job.stallTimeout = stallTimeout
+        job.started.connect(lambda job=job: self.jobStarted.emit(job))
+        job.progress.connect(lambda value, job=job: self.jobProgress.emit(job, value))
+        job.stalled.connect(lambda job=job: self.jobStalled.emit(job))
+        job.finished.connect(lambda job=job: self.jobFinished.emit(job))
+        job.failed.connect(lambda error, job=job: self.jobFailed.emit(job, error))
+        return (self.backgroundPool if background else self.pool).submit(job)
+
+    def captureBatch(self, source: str, positions: list, size: QSize = QSize(100, 70)) -> ThumbnailBatch:
+        return ThumbnailBatch(self, source, positions, size, self)
+
+    @staticmethod
+    def pixelRatio() -> float:
+        return qApp.devicePixelRatio() if qApp is not None else 1.0
+
+    def pixelSize(self, size: QSize) -> QSize:
+        return size * self.pixelRatio()
+
+    def openDecoder(self, source: str) -> None:
+        self.closeDecoder()
+        if self.useDecoder and DecoderSession.available():
+            try:
+                self.decoder = DecoderThread(DecoderSession(source), self)
+            except (OSError, ValueError, IndexError):
+                self.decoder = None
+                return
+            self.decoder.frameDecoded.connect(self.decoderFrame)
+
+    def closeDecoder(self) -> None:
+        if self.decoder is not None:
+            self.decoder.close()
+            self.decoder.deleteLater()
+            self.decoder = None
+
+    def decoderThread(self, source: str) -> DecoderThread:
+        if self.decoder is not None and self.decoder.source == source:
+            return self.decoder
+        return None
+
+    @staticmethod
+    def captureArgs(source: str, position: int, size: QSize, mode: str = ACCURATE) -> str:
+        seek = '-skip_frame nokey -noaccurate_seek' if mode == VideoService.FAST else '-accurate_seek'
+        return '-v error %s -ss %s -i "%s" -an -sn -vframes 1 -vf "scale=%i:%i:force_original_aspect_ratio=decrease" ' \
+               '-f image2pipe -vcodec png -compression_level 0 -' \
+               % (seek, TimeCode.toArg(position), source, size.width(), size.height())
+
+    def filmstrip(self, source: str, count: int = 40, height: int = 32) -> None:
+        key = self.thumbnailCache.key(source, -1, QSize(count, height))
+        image = self.thumbnailCache.get(key)
+        if image is not None:
+            QTimer.singleShot(0, lambda: self.filmstripReady.emit(source, image))
+            return
+        duration = self.mediaInfo(source).format.duration
+        if duration <= 0:
+            return
+        output = '%s.partial.png' % self.thumbnailCache.filePath(key)[:-4]
+        args = '-skip_frame nokey -i "%s" -an -sn -vf "fps=%f,scale=-2:%i,tile=%ix1" -frames:v 1 -y "%s"' \
+               % (source, count / duration, height, count, QDir.fromNativeSeparators(output))
+        job = self.submit(args, duration=duration, background=True)
+        job.outputs.append(output)
+        job.finished.connect(lambda: self.filmstripDone(source, key, output))
+
+    def filmstripDone(self, source: str, key: str, output: str) -> None:
+        image = QImage(output, 'PNG')
+        if os.path.isfile(output):
+            os.remove(output)
+        if not image.isNull():
+            self.thumbnailCache.put(key, image)
+            self.filmstripReady.emit(source, image)
+
+    def keyframes(self, source: str) -> list:
+        index = self.packetIndex(source)
+        return index.keyframes if index is not None else []
+
+    def indexFile(self, source: str) -> str:
+        return os.path.join(self.indexPath, '%s.v%i.idx' % (self.mediaProbe.key(source), PacketIndex.version))
+
+    @staticmethod
+    def indexArgs(source: str, output: str) -> str:
+        return '-v error -select_streams v:0 -show_entries packet=pts_time,size,pos,flags -of csv=print_section=0 ' \
+               '-o "%s" "%s"' % (output, source)
+
+    def packetIndex(self, source: str) -> PacketIndex:
+        if source not in self.packetIndexes and source not in self.indexJobs:
+            self.buildPacketIndex(source)
+        if source in self.indexJobs:
+            self.waitForJob(self.indexJobs[source])
+        return self.packetIndexes.get(source)
+
+    def openPacketIndex(self, source: str, path: str) -> None:
+        try:
+            index = PacketIndex(path)
+        except (OSError, ValueError):
+            return
+        if self.packetIndexes.get(source) is not None:
+            self.packetIndexes[source].close()
+        self.packetIndexes[source] = index
+
+    def buildPacketIndex(self, source: str) -> None:
+        try:
+            path = self.indexFile(source)
+        except OSError:
+            return
+        if source in self.packetIndexes or source in self.indexJobs:
+            return
+        if os.path.isfile(path) or self.nativePacketIndex(source, path):
+            self.openPacketIndex(source, path)
+            return
+        scan = '%s.csv' % path
+        job = self.submit(self.indexArgs(source, scan), cmd=self.probe, background=True)
+        job.outputs.append(scan)
+        job.finished.connect(lambda: self.packetIndexBuilt(source, path, scan))
+        job.failed.connect(lambda error: self.packetIndexFailed(source))
+        self.indexJobs[source] = job
+
+    def nativePacketIndex(self, source: str, path: str) -> bool:
+        packets = ContainerIndex.read(source)
+        if not packets:
+            return False
+        self.writePacketIndex(source, path, packets)
+        return True
+
+    def writePacketIndex(self, source: str, path: str, packets: list) -> None:
+        offset = self.mediaInfo(source).format.startTime
+        PacketIndex.write(path, [(pts - offset, pos, size, flags) for pts, pos, size, flags in packets])
+
+    @staticmethod
+    def waitForJob(job: VideoJob) -> None:
+        if not job.done:
+            loop = QEventLoop()
+            job.finished.connect(loop.quit)
+            job.failed.connect(loop.quit)
+            loop.exec_(QEventLoop.ExcludeUserInputEvents)
 
-    def initProc(self) -> None:
-        self.proc = QProcess(self.parent)
-        self.proc.setProcessChannelMode(QProcess.MergedChannels)
-        self.proc.setWorkingDirectory(self.getAppPath())
-        if hasattr(self.proc, 'errorOccurred'):
-            self.proc.errorOccurred.connect(self.cmdError)
+    def packetIndexFailed(self, source: str) -> None:
+        self.indexJobs.pop(source, None)
+        self.packetIndexes.setdefault(source, None)
 
-    def capture(self, source: str, frametime: str) -> QPixmap:
-        img, capres = None, QPixmap()
+    def packetIndexBuilt(self, source: str, path: str, scan: str) -> None:
+        self.indexJobs.pop(source, None)
         try:
-            img = QTemporaryFile(os.path.join(QDir.tempPath(), 'XXXXXX.jpg'))
-            if img.open():
-                imagecap = img.fileName()
-                args = '-ss %s -i "%s" -vframes 1 -s 100x70 -y %s' % (frametime, source, imagecap)
-                if self.cmdExec(self.backend, args):
-                    capres = QPixmap(imagecap, 'JPG')
-        finally:
-            del img
-        return capres
-
-    def cut(self, source: str, output: str, frametime: str, duration: str) -> bool:
-        args = '-i "%s" -ss %s -t %s -vcodec copy -acodec copy -y "%s"' \
-               % (source, frametime, duration, QDir.fromNativeSeparators(output))
-        return self.cmdExec(self.backend, args)
-
-    def join(self, filelist: list, output: str) -> bool:
+            with open(scan, 'r', encoding='utf-8', errors='replace') as f:
+                packets = PacketIndex.parse(f.read())
+            os.remove(scan)
+        except OSError:
+            self.packetIndexes.setdefault(source, None)
+            return
+        if source not in self.packetIndexes:
+            self.writePacketIndex(source, path, packets)
+            self.openPacketIndex(source, path)
+
+    def probeMedia(self, source: str) -> None:
+        if self.hasMediaInfo(source):
+            QTimer.singleShot(0, lambda: self.mediaInfoReady.emit(source))
+            return
+        if source in self.probeJobs:
+            return
+        job = self.submit(MediaProbe.args(source), cmd=self.probe)
+        job.finished.connect(lambda: self.mediaProbed(source, job.output))
+        job.failed.connect(lambda error: self.mediaProbed(source, None if job.cancelled else ''))
+        self.probeJobs[source] = job
+
+    def mediaProbed(self, source: str, output: str) -> None:
+        self.probeJobs.pop(source, None)
+        if output is not None:
+            self.mediaProbe.ingest(source, output)
+        self.mediaInfoReady.emit(source)
+
+    def hasMediaInfo(self, source: str) -> bool:
+        return self.mediaProbe.cached(source) is not None
+
+    def mediaInfo(self, source: str) -> MediaInfo:
+        info = self.mediaProbe.cached(source)
+        if info is None:
+            self.probeMedia(source)
+            return MediaProbe.empty(source)
+        return info
+
+    def videoStream(self, source: str) -> StreamInfo:
+        return MediaProbe.firstStream(self.mediaInfo(source), 'video')
+
+    def joinProblems(self, files: list) -> list:
+        if len(files) < 2:
+            return []
+        first = self.mediaInfo(files[0])
+        return ['%s: %s' % (os.path.basename(file), ', '.join(problems)) for file, problems in
+                ((file, MediaProbe.incompatibilities(first, self.mediaInfo(file))) for file in files[1:])
+                if len(problems)]
+
+    def encoderArgs(self, source: str) -> str:
+        info = self.mediaInfo(source)
+        stream = MediaProbe.firstStream(info, 'video')
+        codec = stream.codecName if stream is not None else ''
+        args = ['-c:v %s' % self.encoders.get(codec, 'libx264')]
+        if stream is None:
+            return ' '.join(args)
+        if len(stream.pixelFormat):
+            args.append('-pix_fmt %s' % stream.pixelFormat)
+        profile = stream.profile.lower().replace('constrained ', '').replace(' ', '')
+        if codec in ('h264', 'hevc') and profile in self.profiles:
+            args.append('-profile:v %s' % profile)
+        bitrate = stream.bitRate or info.format.bitRate
+        if bitrate > 0:
+            args.append('-b:v %i' % bitrate)
+        return ' '.join(args)
+
+    def snapToKeyframe(self, source: str, position: float) -> float:
+        index = self.packetIndex(source)
+        if index is None or not index.keyCount:
+            return position
+        keyframe = index.keyframeBefore(position)
+        return keyframe if keyframe is not None else 0.0
+
+    def cutArgs(self, source: str, output: str, start: int, end: int, snap: bool = True) -> tuple:
+        start, end = TimeCode.toSeconds(start), TimeCode.toSeconds(end)
+        if snap:
+            start = self.snapToKeyframe(source, start)
+        args = '-ss %.6f -i "%s" -t %.6f -vcodec copy -acodec copy -avoid_negative_ts make_zero -y "%s"' \
+               % (start, source, end - start, QDir.fromNativeSeparators(output))
+        return args, start, end
+
+    def cut(self, source: str, output: str, start: int, end: int, snap: bool = True) -> VideoJob:
+        args, start, end = self.cutArgs(source, output, start, end, snap)
+        job = self.submit(args, duration=end - start)
+        job.outputs.append(output)
+        return job
+
+    def reencode(self, source: str, output: str, start: int, end: int) -> VideoJob:
+        start, end = TimeCode.toSeconds(start), TimeCode.toSeconds(end)
+        args = '-ss %.6f -i "%s" -t %.6f %s -c:a copy -avoid_negative_ts make_zero -y "%s"' \
+               % (start, source, end - start, self.encoderArgs(source), QDir.fromNativeSeparators(output))
+        job = self.submit(args, duration=end - start)
+        job.outputs.append(output)
+        return job
+
+    def smartCut(self, source: str, output: str, start: int, end: int) -> JobChain:
+        start, end = TimeCode.toSeconds(start), TimeCode.toSeconds(end)
+        keyframes = self.keyframes(source)
+        inner = keyframes[bisect_left(keyframes, start):bisect_right(keyframes, end)]
+        if len(inner) < 2:
+            return self.reencode(source, output, TimeCode.fromSeconds(start), TimeCode.fromSeconds(end))
+        encoder = self.encoderArgs(source)
+        partbase = os.path.join(os.path.dirname(output), '.%s' % os.path.basename(output))
+        pieces, parts = [], []
+        if inner[0] - start > 0.000001:
+            pieces.append((start, inner[0], encoder))
+        pieces.append((inner[0], inner[-1], '-c:v copy'))
+        if end - inner[-1] > 0.000001:
+            pieces.append((inner[-1], end, encoder))
+        partfiles = ['%s.part%i.ts' % (partbase, index) for index in range(len(pieces))]
+        for part, (pstart, pend, codec) in zip(partfiles, pieces):
+            args = '-ss %.6f -i "%s" -t %.6f %s -c:a copy -f mpegts -y "%s"' \
+                   % (pstart, source, pend - pstart, codec, QDir.fromNativeSeparators(part))
+            parts.append(lambda args=args, pduration=pend - pstart: self.submit(args, duration=pduration))
+        listfile = '%s.parts' % partbase
+        with open(listfile, 'w') as fobj:
+            fobj.write('ffconcat version 1.0\n')
+            for part in partfiles:
+                fobj.write('file \'%s\'\n' % part.replace("'", "'\\''"))
+        args = '-f concat -safe 0 -i "%s" -c copy -avoid_negative_ts make_zero -y "%s"' \
+               % (listfile, QDir.fromNativeSeparators(output))
+        chain = JobChain([parts, [lambda args=args: self.submit(args, duration=end - start)]], end - start, self)
+        chain.tempfiles += [listfile] + partfiles
+        chain.outputs.append(output)
+        self.chains = [item for item in self.chains if not item.done] + [chain]
+        return chain
+
+    def cutClips(self, source: str, clips: list, snap: bool = True, strategies: list = None) -> JobBatch:
+        return JobBatch(self.cutJobs(source, clips, snap, strategies), self)
+
+    def cutJobs(self, source: str, clips: list, snap: bool = True, strategies: list = None) -> list:
+        self.keyframes(source)
+        if self.workers <= 0:
+            self.pool.setWorkers(self.defaultWorkers(source))
+        if strategies is None:
+            strategies = ['copy'] * len(clips)
+        jobs = []
+        for (output, start, end), strategy in zip(clips, strategies):
+            if strategy == 'smartcut':
+                jobs.append(self.smartCut(source, output, start, end))
+            elif strategy == 'reencode':
+                jobs.append(self.reencode(source, output, start, end))
+            else:
+                jobs.append(self.cut(source, output, start, end, snap))
+        return jobs
+
+    def extractClips(self, source: str, clips: list) -> VideoJob:
+        self.keyframes(source)
+        starts = [self.snapToKeyframe(source, TimeCode.toSeconds(start)) for _, start, _ in clips]
+        base = min(starts)
+        args, total = '-ss %.6f -i "%s"' % (base, source), 0.0
+        for (output, _, end), start in zip(clips, starts):
+            end = TimeCode.toSeconds(end)
+            args += ' -ss %.6f -t %.6f -vcodec copy -acodec copy -avoid_negative_ts make_zero -y "%s"' \
+                    % (max(0.0, start - base - 0.0005), end - start, QDir.fromNativeSeparators(output))
+            total += end - start
+        job = self.submit(args, duration=total)
+        job.stallTimeout = 0
+        job.outputs += [output for output, _, _ in clips]
+        return job
+
+    def concatClips(self, source: str, clips: list, output: str, snap: bool = True) -> VideoJob:
+        if snap:
+            self.keyframes(source)
+        listfile = os.path.normpath(os.path.join(os.path.dirname(output), '.vidcutter.concat'))
+        total, offset = 0.0, self.mediaInfo(source).format.startTime
+        with open(listfile, 'w') as fobj:
+            fobj.write('ffconcat version 1.0\n')
+            for start, end in clips:
+                start, end = TimeCode.toSeconds(start), TimeCode.toSeconds(end)
+                if snap:
+                    start = self.snapToKeyframe(source, start)
+                total += end - start
+                fobj.write('file \'%s\'\ninpoint %.6f\noutpoint %.6f\n'
+                           % (source.replace("'", "'\\''"), start + offset, end + offset))
+        args = '-f concat -safe 0 -i "%s" -c copy -avoid_negative_ts make_zero -y "%s"' \
+               % (listfile, QDir.fromNativeSeparators(output))
+        job = self.submit(args, duration=total)
+        job.tempfiles.append(listfile)
+        job.outputs.append(output)
+        return job
+
+    def remux(self, source: str, output: str, duration: float = 0.0, background: bool = False) -> VideoJob:
+        args = '-i "%s" -map 0 -c copy -y "%s"' % (source, QDir.fromNativeSeparators(output))
+        job = self.submit(args, duration=duration, background=background)
+        job.outputs.append(output)
+        return job
+
+    def join(self, filelist: str, output: str, duration: float = 0.0) -> VideoJob:
         args = '-f concat -safe 0 -i "%s" -c copy -y "%s"' % (filelist, QDir.fromNativeSeparators(output))
-        return self.cmdExec(self.backend, args)
-
-    def cmdExec(self, cmd: str, args: str = None) -> bool:
-        if self.proc.state() == QProcess.NotRunning:
-            self.proc.start(cmd, shlex.split(args))
-            self.proc.waitForFinished(-1)
-            if self.proc.exitStatus() == QProcess.NormalExit and self.proc.exitCode() == 0:
-                return True
-        return False
+        job = self.submit(args, duration=duration)
+        job.outputs.append(output)
+        return job
+
+    def cancelAll(self) -> None:
+        for chain in self.chains:
+            chain.cancel()
+        self.chains = []
+        self.pool.cancelAll()
+
+    @staticmethod
+    def defaultWorkers(path: str) -> int:
+        cpus = os.cpu_count() or 1
+        if VideoService.isRotational(path):
+            return min(cpus, 2)
+        return min(cpus, 8)
 
-    @pyqtSlot(QProcess.ProcessError)
-    def cmdError(self, error: QProcess.ProcessError) -> None:
-        if error != QProcess.Crashed:
-            QMessageBox.critical(self.parent.parent, "Error calling an external process",
-                                 self.proc.errorString(), buttons=QMessageBox.Cancel)
+    @staticmethod
+    def isRotational(path: str) -> bool:
+        if not sys.platform.startswith('linux'):
+            return False
+        try:
+            dev = os.stat(path).st_dev
+            sysdev = os.path.realpath('/sys/dev/block/%i:%i' % (os.major(dev), os.minor(dev)))
+            for devpath in (sysdev, os.path.dirname(sysdev)):
+                rotational = os.path.join(devpath, 'queue', 'rotational')
+                if os.path.isfile(rotational):
+                    with open(rotational, 'r') as f:
+                        return f.read().strip() == '1'
+        except OSError:
+            pass
+        return False
 
     def getAppPath(self) -> str:
         if getattr(sys, 'frozen', False):
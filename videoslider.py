@@ -1,9 +1,39 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from PyQt5.QtCore import QEvent, QObject, Qt, pyqtSlot
-from PyQt5.QtGui import QColor, QKeyEvent, QMouseEvent, QPaintEvent, QWheelEvent
-from PyQt5.QtWidgets import QSlider, QStyle, QStyleOptionSlider, QStylePainter, QWidget, qApp
+from PyQt5.QtCore import QEvent, QObject, QPoint, QSize, Qt, pyqtSlot
+from PyQt5.QtGui import QColor, QImage, QKeyEvent, QMouseEvent, QPaintEvent, QPixmap, QWheelEvent
+from PyQt5.QtWidgets import (QFrame, QLabel, QSlider, QStyle, QStyleOptionSlider, QStylePainter, QVBoxLayout, QWidget,
+                             qApp)
+
+try:
+    from vidcutter.timecode import TimeCode
+except ImportError:
+    from timecode import TimeCode
+
+
+class VideoPreview(QFrame):
+    def __init__(self, parent=None):
+        super(VideoPreview, self).__init__(parent, Qt.ToolTip)
+        self.setStyleSheet('QFrame { background: #222; border: 1px solid #6A4572; } ' +
+                           'QLabel { border: none; color: #FFF; font-family: "Droid Sans Mono"; }')
+        self.imageLabel = QLabel(self, alignment=Qt.AlignCenter)
+        self.timeLabel = QLabel(self, alignment=Qt.AlignCenter)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(2, 2, 2, 2)
+        layout.setSpacing(2)
+        layout.addWidget(self.imageLabel)
+        layout.addWidget(self.timeLabel)
+        self.setLayout(layout)
+        self.caption = ''
+
+    def setPreview(self, position: int, image: QImage = None, caption: str = None) -> None:
+        if caption is not None:
+            self.caption = caption
+        self.timeLabel.setText(TimeCode.format(position, True) + self.caption)
+        if image is not None:
+            self.imageLabel.setPixmap(QPixmap.fromImage(image))
+        self.adjustSize()
 
 
 class VideoSlider(QSlider):
@@ -20,20 +50,27 @@ class VideoSlider(QSlider):
         self.setTracking(True)
         self.setTickPosition(QSlider.TicksAbove)
         self.setFocus()
+        self.filmstrip = QPixmap()
+        self.preview = VideoPreview(self)
+        self.previewSize = QSize(160, 90)
+        self.previewTag = None
+        self.prefetchTag = None
         self.initStyle()
         self.restrictValue = 0
         self.valueChanged.connect(self.restrictMove)
         self.installEventFilter(self)
 
     def initStyle(self, selected: bool = False, margin: str = '0') -> None:
+        self.styleState = (selected, margin)
         bground = 'transparent'
         if selected:
             bground = 'rgba(255, 255, 255, 0.75)'
+        groove = '#444 url(:images/filmstrip.png) repeat-x' if self.filmstrip.isNull() else 'transparent'
         self.setStyleSheet('''QSlider:horizontal { margin: 25px 0 18px; }
 QSlider::groove:horizontal {
     border: 1px inset #999;
     height: 32px;
-    background: #444 url(:images/filmstrip.png) repeat-x;
+    background: %s;
     position: absolute;
     left: 4px;
     right: 4px;
@@ -62,7 +99,12 @@ QSlider::handle:horizontal {
 }
 QSlider::handle:hover {
     background: purple;
-}''' % (bground, margin))
+}''' % (groove, bground, margin))
+
+    def setFilmstrip(self, image: QImage) -> None:
+        self.filmstrip = QPixmap.fromImage(image)
+        self.initStyle(*self.styleState)
+        self.update()
 
     def setRestrictValue(self, value: int, force: bool = False) -> None:
         self.restrictValue = value
@@ -100,11 +142,51 @@ QSlider::handle:hover {
                     y = self.rect().bottom() - z
                     painter.drawLine(x, y, x, y - h)
                 x += 20
+        if not self.filmstrip.isNull():
+            groove = self.style().subControlRect(QStyle.CC_Slider, opt, QStyle.SC_SliderGroove, self)
+            painter.drawPixmap(groove.adjusted(1, 1, -1, -1), self.filmstrip)
         opt.subControls = QStyle.SC_SliderGroove
         painter.drawComplexControl(QStyle.CC_Slider, opt)
         opt.subControls = QStyle.SC_SliderHandle
         painter.drawComplexControl(QStyle.CC_Slider, opt)
 
+    def previewStep(self) -> int:
+        return max(1000, (self.maximum() - self.minimum()) // 200)
+
+    def showPreview(self, x: int) -> None:
+        loader = self.parentWidget().thumbnailLoader
+        source = self.parentWidget().movieFilename
+        step = self.previewStep()
+        position = QStyle.sliderValueFromPosition(self.minimum(), self.maximum(), x, self.width())
+        position = min(self.maximum(), round(position / step) * step)
+        if self.previewTag is None or self.previewTag[0] != position:
+            loader.drop(self.previewTag)
+            loader.drop(self.prefetchTag)
+            self.previewTag, self.prefetchTag = [position], [None]
+            clips = self.parentWidget().clipTimes
+            covering = ', '.join(str(clips.index(clip) + 1) for clip in clips.covering(position))
+            self.preview.setPreview(position, caption=' - clip %s' % covering if len(covering) else '')
+            loader.request(self.previewTag, source, position, self.previewSize, priority=2)
+            for offset in (1, -1, 2, -2):
+                neighbor = position + offset * step
+                if self.minimum() <= neighbor <= self.maximum():
+                    loader.request(self.prefetchTag, source, neighbor, self.previewSize)
+        groove = self.mapToGlobal(QPoint(x, 0))
+        self.preview.move(groove.x() - self.preview.width() // 2, groove.y() - self.preview.height())
+        self.preview.show()
+
+    def hidePreview(self) -> None:
+        self.preview.hide()
+        if self.previewTag is not None:
+            self.parentWidget().thumbnailLoader.drop(self.previewTag)
+            self.parentWidget().thumbnailLoader.drop(self.prefetchTag)
+            self.previewTag = self.prefetchTag = None
+
+    @pyqtSlot(object, QImage)
+    def setPreview(self, tag: object, image: QImage) -> None:
+        if tag is self.previewTag and tag is not None:
+            self.preview.setPreview(tag[0], image)
+
     def wheelEvent(self, event: QWheelEvent) -> None:
         qApp.sendEvent(self.parentWidget(), event)
 
@@ -119,10 +201,14 @@ QSlider::handle:hover {
             self.setCursor(Qt.SplitHCursor)
         else:
             self.unsetCursor()
+        if self.maximum() > self.minimum():
+            self.showPreview(event.pos().x())
         super(VideoSlider, self).mouseMoveEvent(event)
 
     def eventFilter(self, obj: QObject, event: QEvent):
-        if event.type() == QEvent.MouseButtonRelease:
+        if event.type() == QEvent.Leave:
+            self.hidePreview()
+        elif event.type() == QEvent.MouseButtonRelease:
             if self.parentWidget().mediaPlayer.isVideoAvailable() or self.parentWidget().mediaPlayer.isAudioAvailable():
                 self.setValue(QStyle.sliderValueFromPosition(self.minimum(), self.maximum(), event.x(), self.width()))
                 self.parentWidget().mediaPlayer.setPosition(self.sliderPosition())
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict
+
+from PyQt5.QtCore import QRect, QSize, Qt, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QColor, QImage, QMouseEvent, QPainter, QPaintEvent, QPixmap, QResizeEvent, QWheelEvent
+from PyQt5.QtWidgets import QSizePolicy, QWidget
+
+try:
+    from vidcutter.timecode import TimeCode
+except ImportError:
+    from timecode import TimeCode
+
+
+class VideoTimeline(QWidget):
+    seekRequested = pyqtSignal(int)
+
+    tileSize = QSize(80, 45)
+    minTileSpan = 500
+    accurateSpan = 10000
+    maxTiles = 512
+    prefetchTiles = 2
+    rulerHeight = 14
+    labelSteps = (100, 250, 500, 1000, 2000, 5000, 10000, 15000, 30000, 60000, 120000, 300000, 600000, 900000,
+                  1800000, 3600000)
+
+    def __init__(self, thumbnailLoader, parent=None):
+        super(VideoTimeline, self).__init__(parent)
+        self.loader = thumbnailLoader
+        self.loader.thumbnailReady.connect(self.setTile)
+        self.setFixedHeight(self.tileSize.height() + self.rulerHeight + 4)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.setStatusTip('Scroll to zoom, drag to pan, click to seek')
+        self.source = ''
+        self.duration = 0
+        self.position = 0
+        self.viewStart = 0.0
+        self.msPerPixel = 1.0
+        self.tiles = OrderedDict()
+        self.requests = {}
+        self.dragOrigin = None
+        self.dragged = False
+        self.clips = None
+
+    def setSource(self, source: str, duration: int = 0) -> None:
+        for tag in self.requests.values():
+            self.loader.drop(tag)
+        self.requests = {}
+        self.tiles.clear()
+        self.source = source
+        self.setDuration(duration)
+
+    def setClips(self, clips) -> None:
+        self.clips = clips
+        self.update()
+
+    def setDuration(self, duration: int) -> None:
+        self.duration = max(0, duration)
+        self.viewStart = 0.0
+        self.msPerPixel = self.maxMsPerPixel()
+        self.refresh()
+
+    def setPosition(self, position: int) -> None:
+        self.position = position
+        span = self.width() * self.msPerPixel
+        if self.dragOrigin is None and not self.viewStart <= position <= self.viewStart + span:
+            self.viewStart = position - span / 2
+            self.refresh()
+        else:
+            self.update()
+
+    def maxMsPerPixel(self) -> float:
+        return max(1.0, self.duration / max(1, self.width()))
+
+    def clampView(self) -> None:
+        self.msPerPixel = min(max(self.msPerPixel, 1.0), self.maxMsPerPixel())
+        self.viewStart = min(max(0.0, self.viewStart), max(0.0, self.duration - self.width() * self.msPerPixel))
+
+    def tileSpan(self) -> int:
+        span = self.minTileSpan
+        while span / self.msPerPixel < self.tileSize.width() and span < self.duration:
+            span *= 2
+        return span
+
+    def tileMode(self) -> str:
+        service = self.loader.videoService
+        return service.ACCURATE if self.tileSpan() < self.accurateSpan else service.FAST
+
+    def visibleTiles(self, margin: int = 0) -> list:
+        span = self.tileSpan()
+        first = max(0, int(self.viewStart // span) - margin)
+        last = int((self.viewStart + self.width() * self.msPerPixel) // span) + margin
+        return [index * span for index in range(first, last + 1) if index * span < self.duration]
+
+    def refresh(self) -> None:
+        self.clampView()
+        if len(self.source) and self.duration > 0:
+            mode = self.tileMode()
+            wanted = [(position, mode) for position in self.visibleTiles(self.prefetchTiles)]
+            for key in list(self.requests):
+                if key not in wanted:
+                    self.loader.drop(self.requests.pop(key))
+            visible = self.visibleTiles()
+            for key in wanted:
+                if key not in self.tiles and key not in self.requests:
+                    self.requests[key] = [key[0]]
+                    self.loader.request(self.requests[key], self.source, key[0], self.tileSize,
+                                        0 if key[0] in visible else -1, mode)
+        self.update()
+
+    @pyqtSlot(object, QImage)
+    def setTile(self, tag: object, image: QImage) -> None:
+        for key, request in self.requests.items():
+            if request is tag:
+                del self.requests[key]
+                self.tiles[key] = QPixmap.fromImage(image)
+                while len(self.tiles) > self.maxTiles:
+                    self.tiles.popitem(last=False)
+                self.update()
+                break
+
+    def labelStep(self) -> int:
+        for step in self.labelSteps:
+            if step / self.msPerPixel >= 90:
+                return step
+        return self.labelSteps[-1]
+
+    def paintEvent(self, event: QPaintEvent) -> None:
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor('#222'))
+        if self.duration <= 0:
+            return
+        span, mode = self.tileSpan(), self.tileMode()
+        service = self.loader.videoService
+        fallback = service.FAST if mode == service.ACCURATE else service.ACCURATE
+        for position in self.visibleTiles():
+            x = int((position - self.viewStart) / self.msPerPixel)
+            width = min(int(span / self.msPerPixel), self.tileSize.width())
+            key = next((key for key in ((position, mode), (position, fallback)) if key in self.tiles), None)
+            if key is None:
+                painter.fillRect(QRect(x + 1, 2, width - 2, self.tileSize.height()), QColor('#333'))
+            else:
+                pixmap = self.tiles[key]
+                self.tiles.move_to_end(key)
+                ratio = pixmap.devicePixelRatio()
+                width = min(width, int(pixmap.width() / ratio))
+                painter.drawPixmap(QRect(x, 2, width, int(pixmap.height() / ratio)), pixmap,
+                                   QRect(0, 0, int(width * ratio), pixmap.height()))
+        viewEnd = self.viewStart + self.width() * self.msPerPixel
+        for clip in self.clips.overlapping(int(self.viewStart), int(viewEnd) + 1) if self.clips is not None else []:
+            left = int((clip.start - self.viewStart) / self.msPerPixel)
+            right = int((clip.end - self.viewStart) / self.msPerPixel)
+            painter.fillRect(QRect(left, 0, max(1, right - left), self.height()), QColor(106, 69, 114, 90))
+        painter.setPen(QColor('#999'))
+        step = self.labelStep()
+        top = self.height() - self.rulerHeight
+        for tick in range(int(self.viewStart // step) * step, int(self.viewStart + self.width() * self.msPerPixel) + 1,
+                          step):
+            x = int((tick - self.viewStart) / self.msPerPixel)
+            painter.drawLine(x, top, x, top + 4)
+            painter.drawText(x + 3, self.height() - 2, TimeCode.format(tick, step < 1000))
+        x = int((self.position - self.viewStart) / self.msPerPixel)
+        painter.setPen(QColor('#E0383E'))
+        painter.drawLine(x, 0, x, self.height())
+
+    def wheelEvent(self, event: QWheelEvent) -> None:
+        if self.duration > 0:
+            anchor = self.viewStart + event.pos().x() * self.msPerPixel
+            self.msPerPixel *= 0.8 if event.angleDelta().y() > 0 else 1.25
+            self.clampView()
+            self.viewStart = anchor - event.pos().x() * self.msPerPixel
+            self.refresh()
+        event.accept()
+
+    def mousePressEvent(self, event: QMouseEvent) -> None:
+        if event.button() == Qt.LeftButton:
+            self.dragOrigin = (event.pos().x(), self.viewStart)
+            self.dragged = False
+        event.accept()
+
+    def mouseMoveEvent(self, event: QMouseEvent) -> None:
+        if self.dragOrigin is not None:
+            x, viewStart = self.dragOrigin
+            self.dragged = self.dragged or abs(event.pos().x() - x) > 3
+            if self.dragged:
+                self.setCursor(Qt.ClosedHandCursor)
+                self.viewStart = viewStart - (event.pos().x() - x) * self.msPerPixel
+                self.refresh()
+        event.accept()
+
+    def mouseReleaseEvent(self, event: QMouseEvent) -> None:
+        if self.dragOrigin is not None and not self.dragged and self.duration > 0:
+            self.seekRequested.emit(min(self.duration, int(self.viewStart + event.pos().x() * self.msPerPixel)))
+        self.dragOrigin = None
+        self.unsetCursor()
+        event.accept()
+
+    def resizeEvent(self, event: QResizeEvent) -> None:
+        if event.oldSize().width() > 0 and self.msPerPixel * event.oldSize().width() >= self.duration:
+            self.msPerPixel = self.maxMsPerPixel()
+        self.refresh()